@@ -1,14 +1,20 @@
 #AnythingLLM_airsim.py
-import requests  # 用于调用 AnythingLLM 本地 API
+from startup import lazy_import, run_phases  # 延迟导入与并发启动
+requests = lazy_import("requests")  # 用于调用 AnythingLLM 本地 API（首次使用时导入）
 import re  # 正则表达式库，用于从文本中提取代码块
 import argparse  # 用于解析命令行参数
 from airsim_wrapper import *  # 导入前面定义的 AirSimWrapper 类
+from session_recorder import Session, add_session_args  # 会话录制 / 回放
+from control_server import add_server_args, make_wrapper  # 可选：通过本地控制服务共享 AirSim 连接
+from intent_parser import parse_intent  # 本地解析简单指令
 import os  # 用于与操作系统交互，例如清屏
 
 # 解析命令行参数
 parser = argparse.ArgumentParser()
 parser.add_argument("--prompt", type=str, default="prompts/airsim_basic.txt")
 parser.add_argument("--sysprompt", type=str, default="system_prompts/airsim_basic.txt")
+add_session_args(parser)  # --record / --replay / --replay-speed
+add_server_args(parser)  # --server
 args = parser.parse_args()
 
 # 读取系统提示（系统向导提示信息）
@@ -47,6 +53,11 @@ def ask(prompt):
 
     return reply
 
+# 录制或回放 LLM 请求（未启用时保持原样）
+session = Session.from_args(args)
+ask = session.wrap_ask(ask)
+read_input = session.wrap_input(input)  # 录制或回放用户输入的指令，回放时无需重新键入
+
 # 提取响应中的 Python 代码
 def extract_python_code(content):
     code_blocks = re.findall(r"```(.*?)```", content, re.DOTALL)
@@ -65,21 +76,27 @@ class colors:
     YELLOW = "\033[33m"
     BLUE = "\033[34m"
 
-# 初始化 AirSim 客户端
-print("正在初始化 AirSim...")
-aw = AirSimWrapper()
-print("完成.")
-
-# 读取并发送启动提示信息
+# 读取启动提示信息
 with open(args.prompt, "r", encoding="utf-8") as f:
     prompt = f.read()
 
-ask(prompt)
+# 初始化 AnythingLLM：在后台线程中完成，与 AirSim 连接同时进行
+def init_llm():
+    ask(prompt)
+
+# 并发执行 AirSim 连接与 AnythingLLM 初始化，启动耗时取决于较慢的一方
+print("正在初始化 AirSim 和 AnythingLLM...")
+phases = run_phases({
+    "AirSim": lambda: make_wrapper(args, session),
+    "AnythingLLM": init_llm,
+})
+aw = phases["AirSim"]
+print("完成.")
 print("欢迎来到 AirSim 聊天机器人！我随时准备帮助你解答 AirSim 相关的问题和命令。")
 
 # 进入命令行交互模式
 while True:
-    question = input(colors.YELLOW + "AirSim> " + colors.ENDC)
+    question = read_input(colors.YELLOW + "AirSim> " + colors.ENDC)
 
     if question in ["!quit", "!exit"]:
         break
@@ -87,6 +104,17 @@ while True:
         os.system("cls")
         continue
 
+    # 简单指令（起飞、降落、相对移动等）在本地直接解析执行，无需请求大模型
+    code = parse_intent(question)
+    if code is not None:
+        print(f"\n```python\n{code}\n```\n")
+        chat_history.append({"role": "user", "content": question})
+        chat_history.append({"role": "assistant", "content": f"```python\n{code}\n```"})
+        print("请稍等，我正在 AirSim 中运行代码...")
+        exec(code)
+        print("完成！\n")
+        continue
+
     response = ask(question)
     print(f"\n{response}\n")
 
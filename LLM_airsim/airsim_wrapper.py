@@ -1,7 +1,12 @@
 #airsim_wrapper.py
-import airsim  # AirSim 库，用于与 AirSim 模拟平台进行通信
 import math  # 导入数学库
-import numpy as np  # 导入 numpy 库
+import re  # 拼接物体名称的正则表达式
+import time  # 查询场景物体失败时等待重试
+from motion_profile import MotionProfile  # 按距离与障碍物规划速度和超时
+from startup import lazy_import  # 延迟导入较慢的库
+
+airsim = lazy_import("airsim")  # AirSim 库，用于与 AirSim 模拟平台进行通信（首次使用时导入）
+np = lazy_import("numpy")  # 导入 numpy 库（首次使用时导入）
 
 # 定义一个字典，映射物体名称到 Unreal Engine 中的对象名称
 objects_dict = {
@@ -21,11 +26,20 @@ class AirSimWrapper:
     封装与 AirSim 的交互，提供简化的接口来控制无人机。
     """
 
-    def __init__(self):
+    def __init__(self, client=None, motion_profile=None):
         """
         初始化 AirSim 客户端并进行连接，启用控制权和解锁无人机。
+        :param client: 可选的客户端实例（例如会话录制 / 回放客户端），默认新建 MultirotorClient
+        :param motion_profile: 飞行速度与超时的规划参数，默认使用 MotionProfile()
         """
-        self.client = airsim.MultirotorClient()  # 创建一个多旋翼无人机的客户端实例
+        self.motion_profile = motion_profile if motion_profile is not None else MotionProfile()
+        self.capture = None  # 巡检拍摄（InspectionCapture），None 表示不拍摄
+        self.cancel_check = None  # 取消检查，在每个航段开始前调用，None 表示不检查
+        if client is None:
+            client = airsim.MultirotorClient()  # 创建一个多旋翼无人机的客户端实例
+        self.client = client
+        self.object_positions = {}  # 场景物体位置缓存（除无人机外的物体都不可移动）
+        self.missing_objects = set()  # 场景中找不到的物体，之后的飞行不再查询
         self.client.confirmConnection()  # 确认与 AirSim 的连接
         self.client.enableApiControl(True)  # 启用 API 控制权限
         self.client.armDisarm(True)  # 解锁无人机
@@ -49,16 +63,75 @@ class AirSimWrapper:
         pose = self.client.simGetVehiclePose()  # 获取无人机的位姿
         return [pose.position.x_val, pose.position.y_val, pose.position.z_val]  # 返回位置的坐标值
 
+    def set_motion_profile(self, motion_profile):
+        """
+        设置之后飞行使用的运动参数（例如每个任务使用不同的限速）。
+        :param motion_profile: MotionProfile 实例
+        """
+        self.motion_profile = motion_profile
+
+    def set_capture(self, capture):
+        """
+        设置巡检拍摄：之后每次 fly_path 飞行过程中，经过路径点时在后台拍摄图像。
+        :param capture: InspectionCapture 实例，None 表示不拍摄
+        """
+        self.capture = capture
+
+    def set_cancel_check(self, cancel_check):
+        """
+        设置取消检查：fly_to / fly_path 拆分为多个航段时，每个航段开始前调用，
+        需要中止时由回调抛出异常（例如控制服务被抢占时抛出 Preempted）。
+        cancelLastTask 只能中断当前航段，没有这一检查时后续航段会继续飞行。
+        :param cancel_check: 无参数的回调函数，None 表示不检查
+        """
+        self.cancel_check = cancel_check
+
+    def _check_cancel(self):
+        if self.cancel_check is not None:
+            self.cancel_check()
+
+    def _object_catalog(self):
+        """
+        场景中各物体的位置 {名称: 位置}，用于靠近物体时限速和标注巡检拍摄的目标。
+        尚未缓存的物体通过一次 simListSceneObjects 批量查找，只在首次调用时查询；
+        找不到的物体跳过并记录，查询失败时只使用已缓存的位置，飞行不会因此中断。
+        """
+        names = [name for name in objects_dict
+                 if name not in self.object_positions and name not in self.missing_objects]
+        if names:
+            try:
+                found = query_object_positions(self.client, names)
+            except Exception as e:
+                print(f"⚠ 查询场景物体失败: {e}，本次飞行只考虑已知位置的物体")
+                found = {}
+            else:
+                for name in names:
+                    if name not in found:
+                        print(f"⚠ 场景中找不到物体 {name}，飞行时不考虑该物体")
+                        self.missing_objects.add(name)
+            self.object_positions.update(found)
+        return {name: list(position) for name, position in self.object_positions.items()}
+
+    def _obstacles(self):
+        """
+        场景物体的位置列表，用于靠近物体时限速。
+        """
+        if not self.motion_profile.clearance:
+            return []
+        return list(self._object_catalog().values())
+
     def fly_to(self, point):
         """
-        控制无人机飞到目标点。
+        控制无人机飞到目标点。速度和超时时间由 motion_profile 根据距离和周围物体计算。
         :param point: 目标点的坐标 (x, y, z)
         """
         # 如果目标点的高度大于 0, 则飞行到 -z 的高度，否则使用原始的 z 值
-        if point[2] > 0:
-            self.client.moveToPositionAsync(point[0], point[1], -point[2], 5).join()  # 飞到指定的目标位置
-        else:
-            self.client.moveToPositionAsync(point[0], point[1], point[2], 5).join()
+        target = [point[0], point[1], -point[2] if point[2] > 0 else point[2]]
+        legs = self.motion_profile.plan_segment(self.get_drone_position(), target, self._obstacles())
+        for (x, y, z), speed, timeout in legs:
+            self._check_cancel()  # 被取消时不再飞后续航段
+            self.client.moveToPositionAsync(x, y, z, speed, timeout_sec=timeout).join()  # 飞到指定的目标位置
+            self._ensure_arrived([x, y, z], speed, timeout)
 
     def fly_path(self, points):
         """
@@ -72,16 +145,52 @@ class AirSimWrapper:
                 airsim_points.append(airsim.Vector3r(point[0], point[1], -point[2]))
             else:
                 airsim_points.append(airsim.Vector3r(point[0], point[1], point[2]))
-        # 使用 moveOnPathAsync 方法沿路径飞行
-        self.client.moveOnPathAsync(
-            airsim_points,  # 路径点
-            5,  # 每秒最大速度
-            120,  # 最大允许飞行时间
-            airsim.DrivetrainType.ForwardOnly,  # 仅支持前进的驱动方式
-            airsim.YawMode(False, 0),  # 设置偏航角控制模式
-            20,  # 路径的最大曲率
-            1  # 路径的采样频率
-        ).join()
+        # 按航段规划速度，速度相同的连续航段合并为一次 moveOnPathAsync
+        start = self.get_drone_position()
+        path = [[p.x_val, p.y_val, p.z_val] for p in airsim_points]
+        runs = self.motion_profile.plan_path(start, path, self._obstacles())
+        # 巡检拍摄在独立连接上进行，不影响飞行速度
+        if self.capture is not None:
+            self.capture.start(path, self._object_catalog())
+        try:
+            self._fly_runs(runs)
+        finally:
+            if self.capture is not None:
+                self.capture.stop()
+
+    def _fly_runs(self, runs):
+        for run, speed, timeout, lookahead in runs:
+            self._check_cancel()  # 被取消时不再飞后续航段
+            # 使用 moveOnPathAsync 方法沿路径飞行
+            self.client.moveOnPathAsync(
+                [airsim.Vector3r(*p) for p in run],  # 路径点
+                speed,  # 每秒最大速度
+                timeout,  # 最大允许飞行时间
+                airsim.DrivetrainType.ForwardOnly,  # 仅支持前进的驱动方式
+                airsim.YawMode(False, 0),  # 设置偏航角控制模式
+                lookahead,  # 路径跟踪的前视距离
+                1  # 自适应前视距离
+            ).join()
+            self._ensure_arrived(run[-1], speed, timeout)
+
+    def _ensure_arrived(self, target, speed, timeout):
+        """
+        飞行命令返回后检查是否到达 target（超时返回时 AirSim 不会报错）。
+        未到达时以加倍的超时时间直线飞向 target 重试，超过 max_retries 次仍未到达则抛出异常，
+        避免在错误的位置继续执行后续航段。
+        """
+        profile = self.motion_profile
+        for attempt in range(profile.max_retries + 1):
+            self._check_cancel()  # 被取消（cancelLastTask）时不视为未到达，也不重试
+            error = math.dist(self.get_drone_position(), target)
+            if error <= profile.arrival_tolerance:
+                return
+            if attempt == profile.max_retries:
+                break
+            timeout *= 2
+            print(f"⚠ 未到达 {[round(c, 1) for c in target]}（相差 {error:.1f} m），超时延长至 {timeout:.0f}s 后重试")
+            self.client.moveToPositionAsync(*target, speed, timeout_sec=timeout).join()
+        raise RuntimeError(f"未能到达 {[round(c, 1) for c in target]}，相差 {error:.1f} m")
 
     def set_yaw(self, yaw):
         """
@@ -100,13 +209,52 @@ class AirSimWrapper:
 
     def get_position(self, object_name):
         """
-        获取指定物体的位置。
+        获取指定物体的位置。物体不可移动，首次查询后结果会被缓存。
         :param object_name: 物体的名称，使用 objects_dict 中的映射
+        :raise LookupError: 场景中找不到该物体
         """
-        # 使用物体名称在 Unreal Engine 中进行搜索，匹配所有相关对象
-        query_string = objects_dict[object_name] + ".*"
-        object_names_ue = []
-        while len(object_names_ue) == 0:
-            object_names_ue = self.client.simListSceneObjects(query_string)  # 获取场景中匹配的对象列表
-        pose = self.client.simGetObjectPose(object_names_ue[0])  # 获取第一个匹配物体的位置
-        return [pose.position.x_val, pose.position.y_val, pose.position.z_val]  # 返回物体的位置
+        if object_name in self.missing_objects:
+            raise LookupError(f"场景中找不到物体 {object_name}")
+        if object_name not in self.object_positions:
+            self.object_positions[object_name] = query_object_position(self.client, object_name)
+        return list(self.object_positions[object_name])  # 返回物体的位置（副本，避免调用方修改缓存）
+
+
+def query_object_position(client, object_name, retries=3, retry_interval=0.5):
+    """
+    通过客户端查询指定物体的位置（不经过缓存）。
+    :param client: AirSim 客户端
+    :param object_name: 物体的名称，使用 objects_dict 中的映射
+    :param retries: 场景列表为空时的重试次数（场景刚加载时可能暂时为空）
+    :param retry_interval: 重试间隔（秒）
+    :raise LookupError: 重试后仍找不到该物体
+    """
+    found = query_object_positions(client, [object_name], retries, retry_interval)
+    if object_name not in found:
+        raise LookupError(f"场景中找不到物体 {object_name}")
+    return found[object_name]
+
+
+def query_object_positions(client, object_names, retries=3, retry_interval=0.5):
+    """
+    批量查询多个物体的位置：一次 simListSceneObjects 找出所有匹配的对象，再逐个查询位置。
+    :param object_names: 物体名称列表，使用 objects_dict 中的映射
+    :return: {物体名称: 位置}，找不到的物体不包含在结果中
+    """
+    # 使用物体名称在 Unreal Engine 中进行搜索，匹配所有相关对象
+    query_string = "(" + "|".join(re.escape(objects_dict[name]) for name in object_names) + ").*"
+    object_names_ue = client.simListSceneObjects(query_string)  # 获取场景中匹配的对象列表
+    for _ in range(retries):
+        if object_names_ue:
+            break
+        time.sleep(retry_interval)
+        object_names_ue = client.simListSceneObjects(query_string)
+    positions = {}
+    for name in object_names:
+        # 与单独查询时一致，取第一个以该名称开头的对象
+        match = next((ue for ue in object_names_ue if ue.startswith(objects_dict[name])), None)
+        if match is None:
+            continue
+        pose = client.simGetObjectPose(match)  # 获取物体的位置
+        positions[name] = [pose.position.x_val, pose.position.y_val, pose.position.z_val]
+    return positions
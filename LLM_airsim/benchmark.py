@@ -0,0 +1,374 @@
+#benchmark.py
+import argparse  # 用于解析命令行参数
+import contextlib  # 运行期间将其他输出重定向到 stderr
+import itertools  # 交替使用的目标点
+import json  # 结果以 JSON 输出
+import math  # 供执行的代码使用
+import platform  # 记录运行环境
+import subprocess  # 记录当前的 git 版本
+import sys  # 进度信息输出到 stderr
+import tempfile  # 巡检拍摄测试的临时输出目录
+import time  # 计时
+
+from airsim_wrapper import AirSimWrapper, airsim, np  # AirSim 封装类
+from code_utils import extract_python_code, validate_code  # 代码提取与校验
+from example_index import ExampleIndex  # 从对比实验结果中还原每个任务的回复
+from experiment_tasks import tasks  # 对比实验的任务定义
+from fake_airsim_server import FakeAirSimServer  # 模拟的 AirSim RPC 服务
+from inspection_capture import InspectionCapture  # 飞行过程中的巡检拍摄
+from intent_parser import parse_intent  # 本地解析简单指令
+from llm_backends import BACKENDS, race  # 各大模型后端
+from ollama_manager import OllamaManager  # Ollama 模型管理
+from stub_llm_server import DEFAULT_REPLY, StubLLMServer  # 模拟的大模型服务
+
+BENCHMARKS = ["wrapper", "extract", "ask", "pipeline", "capture"]
+RESULT_CSVS = ["chatgpt_experiment_results.csv", "deepseek_experiment_results.csv"]
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def summarize(samples):
+    """
+    将一组耗时（秒）汇总为毫秒统计值。
+    """
+    ordered = sorted(samples)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "n": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(percentile(50) * 1000, 3),
+        "p95_ms": round(percentile(95) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def connect(airsim_server):
+    return AirSimWrapper(client=airsim.MultirotorClient(port=airsim_server.port))
+
+
+# ========================== 1. AirSimWrapper 调用延迟与 RPC 次数 ==========================
+def bench_wrapper(airsim_server, iterations):
+    """
+    测量 AirSimWrapper 各函数的调用延迟，以及每次调用实际发出的 RPC 次数（由模拟服务统计）。
+    每个函数先调用一次预热（例如填充物体位置缓存），get_position_cold 每次调用前清空缓存。
+    """
+    airsim_server.reset_counts()
+    t0 = time.time()
+    aw = connect(airsim_server)
+    results = {"connect": {"latency_ms": round((time.time() - t0) * 1000, 3),
+                           "rpcs": dict(airsim_server.snapshot_counts())}}
+
+    square = [[0, 0, 10], [20, 0, 10], [20, 20, 10], [0, 20, 10]]
+    targets = itertools.cycle([[10, 0, 10], [0, 0, 10]])  # 交替往返，每次调用都有实际航程
+
+    def get_position_cold():
+        aw.object_positions.clear()
+        aw.get_position("tower1")
+
+    calls = {
+        "takeoff": aw.takeoff,
+        "get_drone_position": aw.get_drone_position,
+        "get_yaw": aw.get_yaw,
+        "get_position_cold": get_position_cold,
+        "get_position_cached": lambda: aw.get_position("tower1"),
+        "fly_to": lambda: aw.fly_to(next(targets)),
+        "fly_path": lambda: aw.fly_path(square),
+        "set_yaw": lambda: aw.set_yaw(90),
+        "land": aw.land,
+    }
+    for name, fn in calls.items():
+        fn()  # 预热
+        airsim_server.reset_counts()
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        counts = airsim_server.snapshot_counts()
+        results[name] = {
+            "latency": summarize(samples),
+            "rpcs_per_call": round(sum(counts.values()) / iterations, 2),
+            "rpc_breakdown": {method: round(n / iterations, 2) for method, n in sorted(counts.items())},
+        }
+        log(f"  wrapper.{name}: {results[name]['latency']['mean_ms']} ms, {results[name]['rpcs_per_call']} RPC")
+    return results
+
+
+# ========================== 2. 代码提取吞吐量 ==========================
+def large_response(size):
+    """
+    生成约 size 字节的模拟回复：说明文字与代码块交替出现，与大模型的长回复结构相同。
+    """
+    prose = "这段代码先获取塔的位置，然后沿 X 轴负方向保持 10 米距离飞行。\n\n"
+    block = ("```python\n"
+             "tower = aw.get_position(\"tower1\")\n"
+             "aw.fly_path([[tower[0] - 10, tower[1], 50], [tower[0] - 10, tower[1] + 20, 50]])\n"
+             "```\n\n")
+    parts = []
+    length = 0
+    while length < size:
+        parts.append(prose)
+        parts.append(block)
+        length += len(prose.encode("utf-8")) + len(block.encode("utf-8"))
+    return "".join(parts)
+
+
+def bench_extract(sizes, iterations):
+    """
+    测量 extract_python_code 在大回复上的吞吐量，以及提取结果的 validate_code 耗时。
+    """
+    results = {}
+    for size in sizes:
+        response = large_response(size)
+        nbytes = len(response.encode("utf-8"))
+        extract_samples, validate_samples = [], []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            code = extract_python_code(response)
+            extract_samples.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            validate_code(code)
+            validate_samples.append(time.perf_counter() - start)
+        mean = sum(extract_samples) / len(extract_samples)
+        results[str(size)] = {
+            "bytes": nbytes,
+            "code_blocks": response.count("```python"),
+            "extract": summarize(extract_samples),
+            "extract_mb_per_s": round(nbytes / mean / 1e6, 2) if mean else None,
+            "validate": summarize(validate_samples),
+        }
+        log(f"  extract.{size}: {results[str(size)]['extract_mb_per_s']} MB/s")
+    return results
+
+
+# ========================== 3. ask() 开销与聊天记录增长 ==========================
+def read_sysprompt(path="system_prompts/airsim_basic.txt"):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def bench_ask(llm_server, turns, backends=("openai", "deepseek", "ollama")):
+    """
+    按前端脚本中 ask() 的方式逐轮追加聊天记录并请求模拟服务。
+    开销 = 客户端耗时 - 服务端耗时（模拟延迟），即序列化、HTTP 与客户端库本身的耗时；
+    同时记录每轮请求的消息数和请求体字节数，反映聊天记录的增长。
+    """
+    config = llm_server.config()
+    sysprompt = read_sysprompt()
+    prompts = list(tasks.values())
+    results = {}
+
+    def run_turns(name, chat):
+        history = [{"role": "system", "content": sysprompt}]
+        llm_server.reset_stats()
+        latency, overhead = [], []
+        for i in range(turns):
+            history.append({"role": "user", "content": prompts[i % len(prompts)]})
+            start = time.perf_counter()
+            reply = chat(history)
+            elapsed = time.perf_counter() - start
+            history.append({"role": "assistant", "content": reply})
+            latency.append(elapsed)
+            overhead.append(max(0.0, elapsed - llm_server.requests[-1]["duration"]))
+        request_bytes = [r["bytes"] for r in llm_server.requests]
+        results[name] = {
+            "first_turn_ms": round(latency[0] * 1000, 3),  # 包含首次导入客户端库、建立连接的耗时
+            "latency": summarize(latency),
+            "overhead": summarize(overhead),
+            "history": {
+                "messages": [r["messages"] for r in llm_server.requests],
+                "request_bytes": request_bytes,
+                "bytes_per_turn": round((request_bytes[-1] - request_bytes[0]) / max(1, turns - 1), 1),
+            },
+        }
+        log(f"  ask.{name}: 开销 {results[name]['overhead']['mean_ms']} ms, "
+            f"请求体 {request_bytes[0]} -> {request_bytes[-1]} 字节")
+
+    for name in backends:
+        run_turns(name, lambda messages, name=name: BACKENDS[name](messages, config))
+
+    manager = OllamaManager(host=llm_server.url)
+    run_turns("ollama_manager", manager.chat)
+
+    # 竞速：所有后端使用同一个模拟服务，测量并发请求与校验的额外开销
+    samples = []
+    messages = [{"role": "system", "content": sysprompt}, {"role": "user", "content": prompts[0]}]
+    for _ in range(turns):
+        start = time.perf_counter()
+        race(messages, list(backends), config, log_path=None)
+        samples.append(time.perf_counter() - start)
+    results["race"] = {"backends": list(backends), "latency": summarize(samples)}
+    log(f"  ask.race: {results['race']['latency']['mean_ms']} ms")
+    return results
+
+
+# ========================== 4. 完整任务流程 ==========================
+def task_responder(index):
+    """
+    模拟服务的回复函数：返回对比实验中该指令最相似的一次成功运行生成的代码。
+    """
+    def respond(messages):
+        found = index.search(messages[-1]["content"], 1)
+        if not found:
+            return DEFAULT_REPLY
+        return f"```python\n{found[0][1]['code']}\n```"
+    return respond
+
+
+def bench_pipeline(airsim_server, llm_server, repeats, backend="deepseek"):
+    """
+    对每个对比实验任务执行完整流程：本地解析 -> 请求大模型 -> 提取代码 -> 校验 -> 在模拟 AirSim 中执行，
+    记录各阶段耗时和 RPC 次数。回复取自对比实验中成功运行的代码。
+    """
+    index = ExampleIndex(None)
+    for path in RESULT_CSVS:
+        index.add_from_csv(path, tasks)
+    llm_server.responder = task_responder(index)
+    config = llm_server.config()
+    sysprompt = read_sysprompt()
+    aw = connect(airsim_server)
+    results = {}
+
+    for task_name, prompt in tasks.items():
+        stages = {"intent": [], "llm": [], "extract": [], "validate": [], "exec": [], "total": []}
+        rpcs, errors = [], []
+        for _ in range(repeats):
+            airsim_server.reset_counts()
+            history = [{"role": "system", "content": sysprompt}, {"role": "user", "content": prompt}]
+            t_start = time.perf_counter()
+
+            start = time.perf_counter()
+            code = parse_intent(prompt)
+            stages["intent"].append(time.perf_counter() - start)
+            if code is None:
+                start = time.perf_counter()
+                reply = BACKENDS[backend](history, config)
+                stages["llm"].append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                code = extract_python_code(reply)
+                stages["extract"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            ok, reason = validate_code(code)
+            stages["validate"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            try:
+                exec(code, {"aw": aw, "math": math, "np": np})
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+            stages["exec"].append(time.perf_counter() - start)
+            stages["total"].append(time.perf_counter() - t_start)
+            if not ok:
+                errors.append(f"校验未通过: {reason}")
+            rpcs.append(sum(airsim_server.snapshot_counts().values()))
+
+        results[task_name] = {
+            "stages": {name: summarize(samples) for name, samples in stages.items() if samples},
+            "rpcs_per_run": round(sum(rpcs) / len(rpcs), 2),
+            "errors": sorted(set(errors)),
+        }
+        log(f"  pipeline.{task_name}: {results[task_name]['stages']['total']['mean_ms']} ms, "
+            f"{results[task_name]['rpcs_per_run']} RPC")
+    return results
+
+
+# ========================== 5. 巡检拍摄 ==========================
+def bench_capture(repeats, time_scale=0.05, interval=5.0):
+    """
+    比较开启巡检拍摄前后 fly_path 的耗时（飞行不应变慢），并统计拍摄、写入和队列情况。
+    使用单独的模拟服务，按 time_scale 模拟飞行耗时，使拍摄发生在飞行过程中。
+    """
+    airsim_server = FakeAirSimServer(time_scale=time_scale, image_size=(640, 480)).start()
+    aw = connect(airsim_server)
+    path = [[-60, -60, 50], [-60, -40, 50], [-60, -20, 50], [-60, 0, 50]]
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        capture = InspectionCapture(output_dir, airsim.MultirotorClient(port=airsim_server.port), interval)
+        for name, enabled in (("fly_path", None), ("fly_path_capture", capture)):
+            aw.set_capture(enabled)
+            samples = []
+            for _ in range(repeats):
+                aw.fly_to([-60, -80, 50])
+                start = time.perf_counter()
+                aw.fly_path(path)
+                samples.append(time.perf_counter() - start)
+            results[name] = summarize(samples)
+        start = time.perf_counter()
+        capture.close()
+        results["drain_ms"] = round((time.perf_counter() - start) * 1000, 3)  # 飞行结束后写完队列的耗时
+        results["stats"] = dict(capture.stats, blocked=round(capture.stats["blocked"], 3))
+    airsim_server.close()
+    log(f"  capture: {results['fly_path']['mean_ms']} ms -> {results['fly_path_capture']['mean_ms']} ms, "
+        f"拍摄 {results['stats']['captured']} 次")
+    return results
+
+
+if __name__ == "__main__":
+    # 用法：python benchmark.py --output benchmark_results.json
+    #       python benchmark.py --only wrapper pipeline --rpc-latency 0.001 --llm-latency 0.5
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS, help="只运行指定的基准测试")
+    parser.add_argument("--iterations", type=int, default=50, help="微基准的重复次数")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="代码提取测试的回复大小（字节）")
+    parser.add_argument("--turns", type=int, default=20, help="ask() 测试的对话轮数")
+    parser.add_argument("--repeats", type=int, default=3, help="每个完整任务流程的重复次数")
+    parser.add_argument("--backend", type=str, default="deepseek", choices=list(BACKENDS), help="完整流程使用的后端")
+    parser.add_argument("--rpc-latency", type=float, default=0.0, help="模拟 AirSim 每次 RPC 的额外延迟（秒）")
+    parser.add_argument("--time-scale", type=float, default=0.0, help="模拟飞行耗时的缩放倍数，0 表示立即完成")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="模拟大模型每个请求的固定延迟（秒）")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="模拟大模型每个输出 token 的延迟（秒）")
+    parser.add_argument("--output", type=str, default=None, help="结果 JSON 文件，默认输出到标准输出")
+    args = parser.parse_args()
+
+    airsim_server = FakeAirSimServer(latency=args.rpc_latency, time_scale=args.time_scale).start()
+    llm_server = StubLLMServer(latency=args.llm_latency, token_latency=args.token_latency).start()
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": vars(args),
+        },
+        "results": {},
+    }
+    runners = {
+        "wrapper": lambda: bench_wrapper(airsim_server, args.iterations),
+        "extract": lambda: bench_extract(args.sizes, args.iterations),
+        "ask": lambda: bench_ask(llm_server, args.turns),
+        "pipeline": lambda: bench_pipeline(airsim_server, llm_server, args.repeats, args.backend),
+        "capture": lambda: bench_capture(args.repeats),
+    }
+    for name in BENCHMARKS:
+        if name in args.only:
+            log(f"运行 {name} ...")
+            with contextlib.redirect_stdout(sys.stderr):  # AirSim 客户端连接时会打印信息，避免混入 JSON 输出
+                report["results"][name] = runners[name]()
+
+    output = json.dumps(report, ensure_ascii=False, indent=1)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        log(f"结果已保存至 {args.output}")
+    else:
+        print(output)
+    llm_server.close()
+    airsim_server.close()
@@ -1,10 +1,15 @@
 #chatgpt_airsim.py
-import openai  # 用于与 OpenAI API 进行交互
+from startup import lazy_import, run_phases  # 延迟导入与并发启动
+openai = lazy_import("openai")  # 用于与 OpenAI API 进行交互（首次使用时导入）
 import re  # 正则表达式库，用于从文本中提取代码块
 import argparse  # 用于解析命令行参数
 from airsim_wrapper import *  # 导入前面定义的 AirSimWrapper 类
+from session_recorder import Session, add_session_args  # 会话录制 / 回放
+from control_server import add_server_args, make_wrapper  # 可选：通过本地控制服务共享 AirSim 连接
+from intent_parser import parse_intent  # 本地解析简单指令
+from example_index import ExampleIndex, add_example_args  # 检索相似的成功示例
 import math  # 数学库
-import numpy as np  # Numpy 库
+np = lazy_import("numpy")  # Numpy 库（首次使用时导入）
 import os  # 用于与操作系统交互，例如清屏
 import json  # 用于处理 JSON 数据
 import time  # 用于时间操作
@@ -13,15 +18,18 @@ import time  # 用于时间操作
 parser = argparse.ArgumentParser()
 parser.add_argument("--prompt", type=str, default="prompts/airsim_basic.txt")  # 默认读取基本提示文件
 parser.add_argument("--sysprompt", type=str, default="system_prompts/airsim_basic.txt")  # 系统提示文件
+add_session_args(parser)  # --record / --replay / --replay-speed
+add_server_args(parser)  # --server
+add_example_args(parser)  # --examples / --top-k / --example-budget
 args = parser.parse_args()  # 解析参数
 
+# 加载过往成功运行的示例索引（文件不存在时为空，不注入示例）
+example_index = ExampleIndex.from_args(args)
+
 # 读取配置文件（包含 API 密钥）
 with open("config.json", "r") as f:
     config = json.load(f)
 
-print("正在初始化 ChatGPT...")
-openai.api_key = config["OPENAI_API_KEY"]  # 设置 OpenAI API 密钥
-
 # 读取系统提示（系统向导提示信息）
 with open(args.sysprompt, "r", encoding="utf-8") as f:
     sysprompt = f.read()
@@ -47,17 +55,19 @@ aw.fly_to([aw.get_drone_position()[0], aw.get_drone_position()[1], aw.get_drone_
 ]
 
 # 定义一个函数，发送聊天请求给 ChatGPT
-def ask(prompt):
+def ask(prompt, shots=()):
     chat_history.append(
         {
             "role": "user",  # 用户提问
             "content": prompt,
         }
     )
+    # 将检索到的相似示例插入到本次提问之前（不写入聊天记录）
+    messages = chat_history[:-1] + list(shots) + chat_history[-1:]
     # 使用 OpenAI API 与 ChatGPT 进行交互
     completion = openai.ChatCompletion.create(
         model="gpt-4o-mini",  #model="gpt-4o-mini",  # model="gpt-3.5-turbo",
-        messages=chat_history,  # 传递聊天历史记录
+        messages=messages,  # 传递聊天历史记录及示例
         temperature=0  # 设置生成文本的多样性，0 表示生成更确定的响应
     )
     # 将助手的回复添加到聊天历史记录中
@@ -70,7 +80,10 @@ def ask(prompt):
     # 返回助手的最新回复
     return chat_history[-1]["content"]
 
-print(f"完成.")
+# 录制或回放 LLM 请求（未启用时保持原样）
+session = Session.from_args(args)
+ask = session.wrap_ask(ask)
+read_input = session.wrap_input(input)  # 录制或回放用户输入的指令，回放时无需重新键入
 
 # 正则表达式，用于提取代码块
 code_block_regex = re.compile(r"```(.*?)```", re.DOTALL)
@@ -97,21 +110,28 @@ class colors:
     YELLOW = "\033[33m"  # 黄色
     BLUE = "\033[34m"  # 蓝色
 
-# 初始化 AirSim 客户端
-print(f"正在初始化 AirSim...")
-aw = AirSimWrapper()  # 创建 AirSimWrapper 实例
-print(f"完成.")
-
-# 读取并发送启动提示信息
+# 读取启动提示信息
 with open(args.prompt, "r", encoding="utf-8") as f:
     prompt = f.read()
 
-ask(prompt)  # 发送初始提示
+# 初始化 ChatGPT：在后台线程中完成，与 AirSim 连接同时进行
+def init_llm():
+    openai.api_key = config["OPENAI_API_KEY"]  # 设置 OpenAI API 密钥（此时才导入 openai）
+    ask(prompt)  # 发送初始提示
+
+# 并发执行 AirSim 连接与 ChatGPT 初始化，启动耗时取决于较慢的一方
+print("正在初始化 AirSim 和 ChatGPT...")
+phases = run_phases({
+    "AirSim": lambda: make_wrapper(args, session),  # 创建 AirSimWrapper 实例
+    "ChatGPT": init_llm,
+})
+aw = phases["AirSim"]
+print("完成.")
 print("欢迎来到 AirSim 聊天机器人！我随时准备帮助你解答 AirSim 相关的问题和命令。")
 
 # 进入命令行交互模式
 while True:
-    question = input(colors.YELLOW + "AirSim> " + colors.ENDC)  # 提示用户输入问题
+    question = read_input(colors.YELLOW + "AirSim> " + colors.ENDC)  # 提示用户输入问题
 
     # 如果用户输入 '!quit' 或 '!exit'，则退出程序
     if question == "!quit" or question == "!exit":
@@ -122,8 +142,19 @@ while True:
         os.system("cls")
         continue
 
+    # 简单指令（起飞、降落、相对移动等）在本地直接解析执行，无需请求大模型
+    code = parse_intent(question)
+    if code is not None:
+        print(f"\n```python\n{code}\n```\n")
+        chat_history.append({"role": "user", "content": question})
+        chat_history.append({"role": "assistant", "content": f"```python\n{code}\n```"})
+        print("请稍等，我正在 AirSim 中运行代码...")
+        exec(code)
+        print("完成！\n")
+        continue
+
     # 否则，将用户问题传递给 ChatGPT 获取回答
-    response = ask(question)
+    response = ask(question, example_index.few_shot_messages(question))
 
     print(f"\n{response}\n")  # 输出回答
 
@@ -133,3 +164,6 @@ while True:
         print("请稍等，我正在 AirSim 中运行代码...")
         exec(extract_python_code(response))  # 执行提取到的代码
         print("完成！\n")
+        # 由操作员确认结果正确后才加入示例库；回放时不修改示例库
+        if args.learn and session.mode != "replay":
+            example_index.confirm_add(question, code)
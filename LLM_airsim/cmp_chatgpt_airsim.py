@@ -3,6 +3,8 @@ import openai  # 导入 OpenAI API 交互库
 import re  # 正则表达式库，用于提取 Python 代码块
 import argparse  # 解析命令行参数
 from airsim_wrapper import *  # 导入 AirSim 控制封装类
+from session_recorder import Session, add_session_args  # 会话录制 / 回放
+from control_server import add_server_args, make_wrapper  # 可选：通过本地控制服务共享 AirSim 连接
 import math  # 数学库
 import numpy as np  # NumPy 计算库
 import os  # 操作系统交互库（如清屏等）
@@ -15,6 +17,8 @@ parser = argparse.ArgumentParser()
 parser.add_argument("--prompt", type=str, default="prompts/airsim_basic.txt")  # 任务提示词文件
 parser.add_argument("--sysprompt", type=str, default="system_prompts/airsim_basic.txt")  # 系统提示词文件
 parser.add_argument("--repeat", type=int, default=3, help="每个任务的重复实验次数")  # 设定实验重复次数
+add_session_args(parser)  # --record / --replay / --replay-speed
+add_server_args(parser)  # --server
 args = parser.parse_args()
 
 # ========================== 2. 读取 API Key ==========================
@@ -47,6 +51,11 @@ def ask(prompt, chat_history):
     return response, response_time
 
 
+# 录制或回放 LLM 请求（未启用时保持原样）
+session = Session.from_args(args)
+ask = session.wrap_ask(ask)
+
+
 # ========================== 4. 提取 Python 代码块 ==========================
 def extract_python_code(content):
     """
@@ -60,7 +69,7 @@ def extract_python_code(content):
 
 # ========================== 5. 初始化 AirSim ==========================
 print("初始化 AirSim...")
-aw = AirSimWrapper()  # 创建 AirSim 客户端
+aw = make_wrapper(args, session)  # 创建 AirSim 客户端
 print("AirSim 初始化完成。")
 
 # ========================== 6. 设定实验数据文件 ==========================
@@ -82,20 +91,7 @@ def log_experiment(data):
 
 
 # ========================== 7. 定义实验任务 ==========================
-tasks = {
-    "基础任务": "请让无人机起飞，然后降落。",
-    "单点导航": "请飞向涡轮机2，并在沿 X 轴负方向保持 12 米距离，高度达到 50 米。",
-    "路径规划": "请让无人机绕塔 tower3 → tower2 → tower1 巡航, 高度 50 米，并与塔沿 X 轴负方向保持 10 米距离。",
-    "复杂飞行": """太阳能面板阵列的前后宽度为30米，左右长度为50米。
-    假设通过 aw.get_position("solarpanels") 获取到太阳能面板的坐标 (x, y, z)，
-    则阵列的四个端点分别是：(x, y, z), (x-30, y, z), (x-30, y-50, z), (x, y-50, z)。
-    你需要让无人机按照以下算法扫描整个面板阵列，无人机的扫描算法如下：
-    1. 无人机从阵列的最右前端顶点 (x, y, z) 起飞，并保持飞行高度为5米。
-    2. 将阵列的长度（50米）均分为10行。
-    3. 在每次飞行过程中，无人机沿阵列的宽度方向（即从前到后）逐行扫描，每次飞行完成后，
-       飞往下一行的起点，准备扫描下一行。（即：沿x方向从x到x-30）
-    4. 重复此过程，直到覆盖整个太阳能面板阵列。"""
-}
+from experiment_tasks import tasks  # 实验任务定义
 
 # ========================== 8. 执行实验 ==========================
 for task_name, task_prompt in tasks.items():
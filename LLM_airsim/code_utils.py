@@ -0,0 +1,58 @@
+#code_utils.py
+import ast  # 用于静态检查生成的代码
+import re  # 正则表达式库，用于从文本中提取代码块
+from airsim_wrapper import objects_dict  # 场景中可用物体的名称
+
+# 提示词中为大模型定义的函数（见 prompts/airsim_basic.txt）
+AW_FUNCTIONS = {
+    "takeoff", "land", "get_drone_position", "fly_to", "fly_path",
+    "set_yaw", "get_yaw", "get_position",
+}
+
+# 正则表达式，用于提取代码块
+code_block_regex = re.compile(r"```(.*?)```", re.DOTALL)
+
+
+def extract_python_code(content):
+    """
+    提取响应中的 Python 代码（与各前端脚本的实现一致）。
+    :param content: 大模型生成的文本
+    :return: 代码字符串（如果存在），否则返回 None
+    """
+    code_blocks = code_block_regex.findall(content)  # 查找所有代码块
+    if code_blocks:
+        full_code = "\n".join(code_blocks)  # 将所有代码块拼接在一起
+
+        # 如果代码块以 'python' 开头，去掉 'python' 字符串
+        if full_code.startswith("python"):
+            full_code = full_code[7:]
+
+        return full_code
+    return None
+
+
+def validate_code(code):
+    """
+    在执行前对生成的代码做静态检查：
+    1. 代码可以被解析；
+    2. 只调用提示词中定义的 aw.* 函数；
+    3. aw.get_position() 的字面量参数是场景中存在的物体。
+    :param code: 代码字符串
+    :return: (是否通过, 失败原因)
+    """
+    if not code:
+        return False, "没有代码"
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return False, f"语法错误: {e}"
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "aw":
+            if node.attr not in AW_FUNCTIONS:
+                return False, f"未定义的函数 aw.{node.attr}"
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr == "get_position" and node.args
+                and isinstance(node.args[0], ast.Constant) and node.args[0].value not in objects_dict):
+            return False, f"未知物体 {node.args[0].value}"
+    return True, ""
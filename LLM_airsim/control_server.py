@@ -0,0 +1,488 @@
+#control_server.py
+import argparse  # 用于解析命令行参数
+import ast  # 执行前检查代码
+import builtins  # 构造受限的内置函数
+import hmac  # 比较访问令牌
+import ipaddress  # 判断监听地址是否为本机
+import itertools  # 生成命令序号
+import json  # HTTP 请求与响应使用 JSON
+import math  # 供执行的代码使用
+import os  # 检查配置文件是否存在
+import queue  # 命令队列
+import secrets  # 生成访问令牌
+import threading  # 工作线程与遥测线程
+import time  # 遥测时间戳
+import traceback  # 返回执行错误信息
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # 本地 HTTP 服务
+
+from airsim_wrapper import AirSimWrapper, airsim, query_object_position  # AirSim 封装类
+from motion_profile import MotionProfile, add_motion_args  # 飞行速度与超时的规划参数
+from inspection_capture import InspectionCapture, add_capture_args  # 飞行过程中的巡检拍摄
+from startup import lazy_import  # 延迟导入
+
+requests = lazy_import("requests")  # 客户端使用
+
+# 可以通过 /command 调用的 AirSimWrapper 方法
+COMMANDS = {"takeoff", "land", "fly_to", "fly_path", "set_yaw", "get_yaw", "get_drone_position", "get_position"}
+# 可以通过 /state 批量查询的只读方法（在独立连接上执行，不需要排队）
+QUERIES = {"get_drone_position", "get_yaw", "get_position", "telemetry"}
+
+# 执行代码可以使用的内置函数（不包含 open、eval、exec、getattr 等）
+SAFE_BUILTINS = {name: getattr(builtins, name) for name in (
+    "abs", "all", "any", "bool", "dict", "divmod", "enumerate", "filter", "float", "int", "isinstance", "len",
+    "list", "map", "max", "min", "pow", "print", "range", "reversed", "round", "set", "sorted", "str", "sum",
+    "tuple", "zip", "Exception", "ValueError",
+)}
+# 执行代码可以导入的模块。不提供 numpy：np.savetxt / np.load / ndarray.tofile 等可以读写任意文件，
+# 而且 numpy 内部的延迟导入依赖完整的内置函数
+SAFE_MODULES = {"math": math}
+
+# 不允许访问的属性前缀：下划线开头的内部属性（__class__、__globals__ 等），以及生成器、协程、
+# 栈帧、回溯和代码对象的属性（gi_frame、f_back、f_globals、tb_frame 等），它们可以找到服务自身的栈帧
+FORBIDDEN_ATTRIBUTE_PREFIXES = ("_", "gi_", "cr_", "ag_", "f_", "tb_", "co_")
+
+TOKEN_HEADER = "X-Control-Token"  # 访问令牌所在的请求头
+
+PRIORITY_EMERGENCY = 0  # 紧急命令（如紧急降落）
+PRIORITY_NORMAL = 10  # 普通命令
+
+
+class Preempted(Exception):
+    """
+    命令被更高优先级的抢占命令中断或取消。
+    """
+
+
+class _Command:
+    def __init__(self, priority, method=None, args=(), code=None):
+        self.priority = priority
+        self.method = method
+        self.args = list(args)
+        self.code = code
+        self.result = None
+        self.error = None
+        self.generation = 0  # 提交时的抢占代数，执行时与当前代数不同说明已被抢占
+        self.done = threading.Event()
+
+
+class _GuardedWrapper:
+    """
+    供执行代码使用的 AirSimWrapper 代理：只开放 COMMANDS 中的方法，每次调用前检查是否被抢占，
+    使多步的生成代码在紧急命令到来后不再继续执行后续步骤。
+    """
+
+    def __init__(self, server):
+        self._server = server
+
+    def __getattr__(self, name):
+        if name not in COMMANDS:
+            raise AttributeError(f"aw 不支持 {name}")
+        attr = getattr(self._server.aw, name)
+
+        def call(*args, **kwargs):
+            self._server.check_preempted()
+            return attr(*args, **kwargs)
+
+        return call
+
+
+def _safe_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name not in SAFE_MODULES:
+        raise ImportError(f"不允许导入 {name}")
+    return SAFE_MODULES[name]
+
+
+def check_code(code):
+    """
+    执行前检查代码：不允许访问 FORBIDDEN_ATTRIBUTE_PREFIXES 开头的属性，
+    避免通过对象内部属性或栈帧绕过受限的内置函数。
+    :raise ValueError: 代码无法解析或包含不允许的属性访问
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        raise ValueError(f"语法错误: {e}")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and node.attr.startswith(FORBIDDEN_ATTRIBUTE_PREFIXES):
+            raise ValueError(f"不允许访问属性 {node.attr}")
+        if isinstance(node, ast.Name) and node.id.startswith("__"):
+            raise ValueError(f"不允许使用 {node.id}")
+
+
+def is_loopback(host):
+    """
+    判断监听地址是否只能从本机访问。
+    """
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # 主机名无法确定解析结果，按非本机处理
+
+
+def load_token(path="config.json"):
+    """
+    从 config.json 读取控制服务的访问令牌（CONTROL_TOKEN），文件或字段不存在时返回 None。
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("CONTROL_TOKEN") or None
+
+
+class ControlServer:
+    """
+    常驻的本地控制服务，独占 AirSim 连接，供多个操作终端和实验脚本共享。
+    - 命令按优先级排队，由单个工作线程依次执行（AirSim 客户端不是线程安全的）；
+    - 抢占命令（如紧急降落）会清空队列，并通过独立连接中断正在执行的飞行任务；
+    - 状态查询与抢占使用另一条独立连接，不会被正在执行的飞行命令阻塞；
+    - 遥测定时查询，使用第三条连接，不经过会话录制（否则录制的事件与回放时的查询无法一一对应）；
+    - 场景物体位置缓存在 AirSimWrapper 中，所有客户端共享。
+    """
+
+    def __init__(self, client=None, side_client=None, telemetry_interval=0.1, motion_profile=None,
+                 telemetry_client=None):
+        """
+        :param client: 执行命令的客户端，默认新建
+        :param side_client: 状态查询和抢占使用的客户端，默认新建
+        :param telemetry_interval: 遥测刷新间隔（秒），0 表示不启动遥测线程
+        :param motion_profile: 飞行速度与超时的规划参数，默认使用 MotionProfile()
+        :param telemetry_client: 遥测使用的客户端，默认新建（不要传入会话录制的客户端）
+        """
+        self.aw = AirSimWrapper(client=client, motion_profile=motion_profile)
+        self.aw.set_cancel_check(self.check_preempted)  # 多航段飞行被抢占时不再继续后续航段
+        self.side = side_client if side_client is not None else airsim.MultirotorClient()
+        self.side_lock = threading.Lock()
+        self.queue = queue.PriorityQueue()
+        self.counter = itertools.count()  # 同优先级按到达顺序执行
+        self.current = None  # 正在执行的命令
+        self.preempt_lock = threading.Lock()
+        self.preempt_generation = 0  # 每次抢占加 1，正在执行的命令据此判断是否被中断
+        self.running_generation = 0
+        self.telemetry = {}
+        self.telemetry_interval = telemetry_interval
+        self.telemetry_client = None
+
+        threading.Thread(target=self._worker, daemon=True).start()
+        if telemetry_interval:
+            self.telemetry_client = telemetry_client if telemetry_client is not None else airsim.MultirotorClient()
+            threading.Thread(target=self._telemetry_loop, daemon=True).start()
+
+    # -------------------------- 命令队列 --------------------------
+    def submit(self, method=None, args=(), code=None, priority=PRIORITY_NORMAL, preempt=False):
+        """
+        提交一条命令（AirSimWrapper 方法或一段 Python 代码）。
+        :param preempt: 是否抢占：取消排队中的命令并中断正在执行的命令
+        :return: _Command，调用方可等待 done 事件
+        """
+        if method is not None and method not in COMMANDS:
+            raise ValueError(f"未知命令 {method}")
+        if code is not None:
+            check_code(code)
+        command = _Command(priority, method, args, code)
+        if preempt:
+            self.preempt()  # 先中断当前任务再入队，cancelLastTask 不会中断抢占命令自身
+        # 记录代数与入队在同一把锁内完成，不会与其他抢占清空队列交错
+        with self.preempt_lock:
+            command.generation = self.preempt_generation
+            self.queue.put((priority, next(self.counter), command))
+        return command
+
+    def preempt(self):
+        """
+        取消所有排队中的命令，并中断正在执行的飞行任务。
+        """
+        with self.preempt_lock:
+            self._cancel_queued()
+        self._cancel_running()
+
+    def _cancel_queued(self):
+        # 调用方持有 preempt_lock
+        self.preempt_generation += 1
+        while True:
+            try:
+                _, _, command = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            command.error = "被抢占命令取消"
+            command.done.set()
+
+    def _cancel_running(self):
+        # 不判断 current：工作线程可能刚从队列取出命令、尚未设置 current，
+        # 该命令的代数已过期，会在开始执行或下一个航段前被中断
+        with self.side_lock:
+            self.side.cancelLastTask()  # 使正在 join() 的飞行任务立即返回
+
+    def check_preempted(self):
+        if self.running_generation != self.preempt_generation:
+            raise Preempted("被抢占命令中断")
+
+    def _worker(self):
+        while True:
+            _, _, command = self.queue.get()
+            with self.preempt_lock:
+                self.current = command
+                self.running_generation = command.generation  # 取自提交时，不受取出后才到达的抢占影响
+            try:
+                if command.generation != self.preempt_generation:
+                    raise Preempted("被抢占命令取消")  # 取出后、开始执行前已被抢占
+                if command.code is not None:
+                    # 受限的执行环境：只有白名单中的内置函数、aw 的命令方法和 math
+                    env = {"__builtins__": dict(SAFE_BUILTINS, __import__=_safe_import),
+                           "aw": _GuardedWrapper(self), "math": math}
+                    exec(command.code, env)
+                else:
+                    command.result = getattr(self.aw, command.method)(*command.args)
+            except Preempted as e:
+                command.error = str(e)
+            except Exception:
+                command.error = traceback.format_exc()
+            finally:
+                # 执行期间发生过抢占：飞行任务可能被 cancelLastTask 中断后正常返回，同样视为被中断；
+                # 命令结束（current 清空）之后才到达的抢占与该命令无关
+                with self.preempt_lock:
+                    self.current = None
+                    interrupted = command.generation != self.preempt_generation
+                if interrupted and command.error is None:
+                    command.error = "被抢占命令中断"
+                command.done.set()
+
+    # -------------------------- 状态查询 --------------------------
+    def query(self, queries):
+        """
+        批量查询状态，在独立连接上执行。
+        :param queries: [[方法名, 参数...], ...]，方法名见 QUERIES
+        :return: 与 queries 一一对应的结果列表
+        """
+        results = []
+        with self.side_lock:
+            for method, *args in queries:
+                if method not in QUERIES:
+                    raise ValueError(f"未知查询 {method}")
+                if method == "telemetry":
+                    results.append(dict(self.telemetry))
+                elif method == "get_position":
+                    results.append(self._object_position(*args))
+                else:
+                    results.append(self._pose_query(method))
+        return results
+
+    def _pose_query(self, method):
+        pose = self.side.simGetVehiclePose()
+        if method == "get_yaw":
+            return airsim.to_eularian_angles(pose.orientation)[2]
+        return [pose.position.x_val, pose.position.y_val, pose.position.z_val]
+
+    def _object_position(self, object_name):
+        # 缓存未命中时在独立连接上查询，并写入 AirSimWrapper 的缓存供命令共享
+        if object_name not in self.aw.object_positions:
+            self.aw.object_positions[object_name] = query_object_position(self.side, object_name)
+        return list(self.aw.object_positions[object_name])
+
+    def _telemetry_loop(self):
+        while True:
+            try:
+                state = self.telemetry_client.getMultirotorState()
+                kin = state.kinematics_estimated
+                self.telemetry = {
+                    "time": time.time(),
+                    "position": [kin.position.x_val, kin.position.y_val, kin.position.z_val],
+                    "velocity": [kin.linear_velocity.x_val, kin.linear_velocity.y_val, kin.linear_velocity.z_val],
+                    "yaw": airsim.to_eularian_angles(kin.orientation)[2],
+                    "landed": state.landed_state,
+                    "busy": self.current is not None,
+                    "queued": self.queue.qsize(),
+                }
+            except Exception as e:
+                self.telemetry = {"time": time.time(), "error": str(e)}
+            time.sleep(self.telemetry_interval)
+
+    # -------------------------- HTTP 服务 --------------------------
+    def serve(self, host="127.0.0.1", port=8765, token=None):
+        """
+        启动 HTTP 服务（阻塞）。
+        请求必须是 application/json，且在 X-Control-Token 头中携带访问令牌；带有 Origin 头的请求
+        （来自浏览器网页）一律拒绝，防止网页通过本机端口执行代码。
+        :param token: 访问令牌，None 时随机生成并打印；监听非本机地址时必须指定
+        接口：
+        POST /command   {"method": "fly_to", "args": [[x, y, z]]} 或 {"code": "..."}，
+                        可选 "priority"（越小越优先）、"preempt"、"wait"（默认 true）
+        POST /state     {"queries": [["get_drone_position"], ["get_position", "tower1"], ["telemetry"]]}
+        POST /emergency 清空队列、中断当前任务并立即降落
+        """
+        if token is None:
+            if not is_loopback(host):
+                raise ValueError(f"监听非本机地址 {host} 时必须在 config.json 中设置 CONTROL_TOKEN")
+            token = secrets.token_urlsafe(16)
+            print(f"访问令牌（客户端使用 --server-token 指定）: {token}")
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.headers.get("Origin") is not None:
+                    self._reply(403, {"error": "不接受来自浏览器的请求"})
+                    return
+                if self.headers.get("Content-Type", "").split(";")[0].strip().lower() != "application/json":
+                    self._reply(415, {"error": "请求必须是 application/json"})
+                    return
+                if not hmac.compare_digest(self.headers.get(TOKEN_HEADER, "").encode(), token.encode()):
+                    self._reply(401, {"error": "访问令牌错误"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                    self._reply(200, server.handle(self.path, body))
+                except (ValueError, LookupError) as e:
+                    self._reply(400, {"error": str(e)})
+                except Exception:
+                    self._reply(500, {"error": traceback.format_exc()})
+
+            def _reply(self, status, data):
+                payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass  # 不在终端打印每个请求
+
+        httpd = ThreadingHTTPServer((host, port), Handler)
+        print(f"AirSim 控制服务已启动: http://{host}:{port}")
+        httpd.serve_forever()
+
+    def handle(self, path, body):
+        if path == "/command":
+            command = self.submit(body.get("method"), body.get("args", ()), body.get("code"),
+                                  body.get("priority", PRIORITY_NORMAL), body.get("preempt", False))
+            if not body.get("wait", True):
+                return {"queued": True}
+            command.done.wait()
+            return {"result": command.result, "error": command.error}
+        if path == "/state":
+            return {"results": self.query(body.get("queries", []))}
+        if path == "/emergency":
+            command = self.submit("land", priority=PRIORITY_EMERGENCY, preempt=True)
+            command.done.wait()
+            return {"result": command.result, "error": command.error}
+        raise ValueError(f"未知接口 {path}")
+
+
+# ========================== 客户端 ==========================
+class RemoteAirSimWrapper:
+    """
+    控制服务的客户端，提供与 AirSimWrapper 相同的方法，可以直接作为生成代码中的 aw 使用。
+    """
+
+    def __init__(self, url="http://127.0.0.1:8765", token=None):
+        """
+        :param url: 控制服务地址
+        :param token: 访问令牌，默认读取 config.json 中的 CONTROL_TOKEN
+        """
+        self.url = url.rstrip("/")
+        self.session = requests.Session()  # 复用 HTTP 连接
+        self.session.headers[TOKEN_HEADER] = token or load_token() or ""
+
+    def _post(self, path, data):
+        response = self.session.post(self.url + path, json=data)
+        response.raise_for_status()
+        result = response.json()
+        if result.get("error"):
+            raise RuntimeError(result["error"])
+        return result
+
+    def _command(self, method, *args):
+        return self._post("/command", {"method": method, "args": list(args)})["result"]
+
+    def takeoff(self):
+        return self._command("takeoff")
+
+    def land(self):
+        return self._command("land")
+
+    def get_drone_position(self):
+        return self.state(["get_drone_position"])[0]
+
+    def fly_to(self, point):
+        return self._command("fly_to", [float(v) for v in point])
+
+    def fly_path(self, points):
+        return self._command("fly_path", [[float(v) for v in p] for p in points])
+
+    def set_yaw(self, yaw):
+        return self._command("set_yaw", float(yaw))
+
+    def get_yaw(self):
+        return self.state(["get_yaw"])[0]
+
+    def get_position(self, object_name):
+        return self.state(["get_position", object_name])[0]
+
+    def run_code(self, code, priority=PRIORITY_NORMAL):
+        """
+        在服务端执行一段代码（作为一个整体排队，可被抢占）。
+        """
+        return self._post("/command", {"code": code, "priority": priority})
+
+    def state(self, *queries):
+        """
+        批量查询状态，例如 state(["get_drone_position"], ["telemetry"])。
+        """
+        return self._post("/state", {"queries": [list(q) for q in queries]})["results"]
+
+    def emergency_land(self):
+        return self._post("/emergency", {})
+
+
+def add_server_args(parser):
+    """
+    为前端脚本添加创建 aw 所需的命令行参数：控制服务地址、运动参数与巡检拍摄。
+    使用 --server 时飞行由控制服务执行，运动参数和巡检拍摄以启动服务时指定的为准。
+    """
+    parser.add_argument("--server", type=str, default=None,
+                        help="AirSim 控制服务地址（如 http://127.0.0.1:8765），默认直接连接 AirSim")
+    parser.add_argument("--server-token", type=str, default=None,
+                        help="控制服务的访问令牌，默认读取 config.json 中的 CONTROL_TOKEN")
+    add_motion_args(parser)  # --motion-profile / --mission
+    add_capture_args(parser)  # --capture / --capture-interval / ...
+
+
+def make_wrapper(args, session):
+    """
+    根据命令行参数创建 aw：指定了 --server 时连接控制服务，否则直接连接 AirSim。
+    """
+    if args.server:
+        return RemoteAirSimWrapper(args.server, args.server_token)
+    aw = AirSimWrapper(client=session.make_client(), motion_profile=MotionProfile.from_args(args))
+    aw.set_capture(InspectionCapture.from_args(args, session))
+    return aw
+
+
+if __name__ == "__main__":
+    from session_recorder import Session, add_session_args
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1",
+                        help="监听地址，默认仅供本机访问；其他地址需要在 config.json 中设置 CONTROL_TOKEN")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--telemetry-interval", type=float, default=0.1, help="遥测刷新间隔（秒）")
+    add_session_args(parser)  # --record / --replay / --replay-speed
+    add_motion_args(parser)  # --motion-profile / --mission
+    add_capture_args(parser)  # --capture / --capture-interval / ...
+    args = parser.parse_args()
+
+    token = load_token()
+    if token is None and not is_loopback(args.host):
+        parser.error(f"监听非本机地址 {args.host} 时必须在 config.json 中设置 CONTROL_TOKEN")
+
+    session = Session.from_args(args)
+    print("正在初始化 AirSim...")
+    # 遥测使用不经过录制的独立连接；回放时没有模拟器，不启动遥测线程
+    interval = 0 if session.mode == "replay" else args.telemetry_interval
+    control = ControlServer(session.make_client(), session.make_client("rpc-side"), interval,
+                            MotionProfile.from_args(args))
+    control.aw.set_capture(InspectionCapture.from_args(args, session))
+    print("完成.")
+    control.serve(args.host, args.port, token)
@@ -0,0 +1,205 @@
+#example_index.py
+import argparse  # 命令行构建 / 查询索引
+import csv  # 读取对比实验结果
+import json  # 索引以 JSON 文件保存在本地
+import math  # 计算 IDF 与向量范数
+import os  # 检查索引文件是否存在
+import re  # 文本切分
+from collections import Counter  # 统计词频
+
+
+def _tokens(text):
+    """
+    将文本切分为检索用的词项：中文按字的二元组（bigram），英文和数字按单词（如 tower3）。
+    """
+    text = text.lower()
+    tokens = re.findall(r"[a-z_][a-z0-9_]*|\d+(?:\.\d+)?", text)
+    for run in re.findall(r"[一-鿿]+", text):
+        if len(run) == 1:
+            tokens.append(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def estimate_tokens(text):
+    """
+    粗略估计文本的 token 数：中文每个字约 1 个 token，其余字符约 4 个字符 1 个 token。
+    """
+    cjk = len(re.findall(r"[一-鿿]", text))
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+class ExampleIndex:
+    """
+    由过往成功运行的 (指令, 生成代码) 组成的本地示例库，使用 TF-IDF 余弦相似度检索。
+    示例保存在 JSON 文件中，IDF 在加载时重新计算（示例数量很少，开销可以忽略）。
+    """
+
+    def __init__(self, path="example_index.json", top_k=3, token_budget=1500):
+        """
+        :param path: 索引文件路径，文件不存在时为空索引
+        :param top_k: 每次请求注入的示例数量
+        :param token_budget: 注入示例占用的 token 上限
+        """
+        self.path = path
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self.examples = []  # [{"prompt": ..., "code": ...}]
+        if path and os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.examples = json.load(f)["examples"]
+        self._reindex()
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        根据命令行参数创建索引，参数由 add_example_args 添加。
+        """
+        return cls(args.examples, args.top_k, args.example_budget)
+
+    def _reindex(self):
+        self._vectors = []
+        df = Counter()
+        counts = [Counter(_tokens(e["prompt"])) for e in self.examples]
+        for c in counts:
+            df.update(c.keys())
+        n = len(self.examples)
+        self._idf = {t: math.log((1 + n) / (1 + d)) + 1 for t, d in df.items()}
+        for c in counts:
+            self._vectors.append(self._weigh(c))
+
+    def _weigh(self, counts):
+        vec = {t: tf * self._idf.get(t, 0.0) for t, tf in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {t: v / norm for t, v in vec.items() if v}
+
+    def add(self, prompt, code):
+        """
+        添加一个成功的示例，完全相同的 (指令, 代码) 不会重复添加。
+        """
+        example = {"prompt": prompt.strip(), "code": code.strip()}
+        if example in self.examples:
+            return
+        self.examples.append(example)
+        self._reindex()
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"examples": self.examples}, f, ensure_ascii=False, indent=1)
+
+    def confirm_add(self, prompt, code, read=input):
+        """
+        代码执行完成后询问操作员结果是否正确，确认后才加入示例库并保存。
+        执行没有报错不代表完成了指令（例如移动距离不对），错误的示例会在之后作为 few-shot 示例被反复使用。
+        :param read: 读取操作员回答的函数（不经过会话录制，回放时不会询问）
+        :return: 是否加入
+        """
+        answer = read("结果是否正确？输入 y 加入示例库: ")
+        if answer.strip().lower() not in ("y", "yes", "是"):
+            return False
+        self.add(prompt, code)
+        self.save()
+        print("已加入示例库。")
+        return True
+
+    def search(self, query, k=3, min_score=0.1):
+        """
+        检索与指令最相似的示例。
+        :param query: 用户指令
+        :param k: 返回的示例数量上限
+        :param min_score: 相似度下限，低于该值的示例不返回
+        :return: [(相似度, 示例)]，按相似度从高到低排列
+        """
+        if not self.examples:
+            return []
+        q = self._weigh(Counter(_tokens(query)))
+        scored = []
+        seen_prompts = set()
+        for vec, example in zip(self._vectors, self.examples):
+            score = sum(w * vec.get(t, 0.0) for t, w in q.items())
+            if score >= min_score:
+                scored.append((score, example))
+        scored.sort(key=lambda s: s[0], reverse=True)
+        result = []
+        for score, example in scored:
+            # 同一指令的多次成功运行只取最相似（最先出现）的一条，避免示例重复
+            if example["prompt"] in seen_prompts:
+                continue
+            seen_prompts.add(example["prompt"])
+            result.append((score, example))
+            if len(result) >= k:
+                break
+        return result
+
+    def few_shot_messages(self, query, k=None, token_budget=None):
+        """
+        生成注入到本次请求中的 few-shot 消息（user / assistant 成对出现），总长度不超过 token 预算。
+        :param query: 用户指令
+        :param k: 示例数量上限，默认使用 top_k
+        :param token_budget: token 预算，默认使用 token_budget
+        :return: 消息列表
+        """
+        k = self.top_k if k is None else k
+        budget = self.token_budget if token_budget is None else token_budget
+        messages = []
+        for _, example in self.search(query, k):
+            answer = f"```python\n{example['code']}\n```"
+            cost = estimate_tokens(example["prompt"]) + estimate_tokens(answer)
+            if cost > budget:
+                continue  # 跳过过长的示例，尝试更短的
+            budget -= cost
+            messages.append({"role": "user", "content": example["prompt"]})
+            messages.append({"role": "assistant", "content": answer})
+        return messages
+
+    def add_from_csv(self, csv_path, task_prompts):
+        """
+        从对比实验结果 CSV 中导入执行成功的示例。
+        CSV 只记录任务类型，指令通过 task_prompts（任务类型 -> 指令）还原。
+        :return: 导入的示例数量
+        """
+        added = 0
+        with open(csv_path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                prompt = task_prompts.get(row["任务类型"])
+                if prompt is None or row["实验次数"] == "平均值":
+                    continue
+                if row["代码执行状态"] != "✅" or row["任务完成状态"] != "✅" or row["生成代码"] == "无代码":
+                    continue
+                before = len(self.examples)
+                self.add(prompt, row["生成代码"])
+                added += len(self.examples) - before
+        return added
+
+
+def add_example_args(parser):
+    """
+    为前端脚本添加示例检索相关的命令行参数。
+    """
+    parser.add_argument("--examples", type=str, default="example_index.json", help="示例索引文件")
+    parser.add_argument("--top-k", type=int, default=3, help="每次请求注入的示例数量")
+    parser.add_argument("--example-budget", type=int, default=1500, help="示例占用的 token 上限")
+    parser.add_argument("--learn", action="store_true",
+                        help="代码执行后询问结果是否正确，确认后加入示例库（回放时不询问、不修改示例库）")
+
+
+if __name__ == "__main__":
+    # 用法：python example_index.py --build chatgpt_experiment_results.csv deepseek_experiment_results.csv
+    #       python example_index.py --query "绕 tower1 巡航"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index", type=str, default="example_index.json", help="索引文件路径")
+    parser.add_argument("--build", nargs="+", default=None, help="从对比实验结果 CSV 导入成功示例")
+    parser.add_argument("--query", type=str, default=None, help="查询与指令最相似的示例")
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    index = ExampleIndex(args.index)
+    if args.build:
+        from experiment_tasks import tasks
+        for path in args.build:
+            print(f"{path}: 导入 {index.add_from_csv(path, tasks)} 个示例")
+        index.save()
+        print(f"索引共 {len(index.examples)} 个示例，已保存至 {args.index}")
+    if args.query:
+        for score, example in index.search(args.query, args.top_k):
+            print(f"[{score:.3f}] {example['prompt']}\n{example['code']}\n")
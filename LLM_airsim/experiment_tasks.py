@@ -0,0 +1,16 @@
+#experiment_tasks.py
+# 对比实验脚本使用的实验任务（任务类型 -> 任务指令），示例检索索引也据此从实验结果中还原指令
+tasks = {
+    "基础任务": "请让无人机起飞，然后降落。",
+    "单点导航": "请飞向涡轮机2，并在沿 X 轴负方向保持 12 米距离，高度达到 50 米。",
+    "路径规划": "请让无人机绕塔 tower3 → tower2 → tower1 巡航, 高度 50 米，并与塔沿 X 轴负方向保持 10 米距离。",
+    "复杂飞行": """太阳能面板阵列的前后宽度为30米，左右长度为50米。
+    假设通过 aw.get_position("solarpanels") 获取到太阳能面板的坐标 (x, y, z)，
+    则阵列的四个端点分别是：(x, y, z), (x-30, y, z), (x-30, y-50, z), (x, y-50, z)。
+    你需要让无人机按照以下算法扫描整个面板阵列，无人机的扫描算法如下：
+    1. 无人机从阵列的最右前端顶点 (x, y, z) 起飞，并保持飞行高度为5米。
+    2. 将阵列的长度（50米）均分为10行。
+    3. 在每次飞行过程中，无人机沿阵列的宽度方向（即从前到后）逐行扫描，每次飞行完成后，
+       飞往下一行的起点，准备扫描下一行。（即：沿x方向从x到x-30）
+    4. 重复此过程，直到覆盖整个太阳能面板阵列。"""
+}
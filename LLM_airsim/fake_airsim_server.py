@@ -0,0 +1,258 @@
+#fake_airsim_server.py
+import argparse  # 用于解析命令行参数
+import math  # 计算距离与姿态
+import re  # 匹配场景物体名称
+import socket  # TCP 服务
+import threading  # 每个连接 / 每个飞行任务一个线程
+import time  # 模拟 RPC 延迟与飞行耗时
+from collections import Counter  # 统计各 RPC 的调用次数
+
+from airsim_wrapper import objects_dict  # 场景中可用物体的名称
+from startup import lazy_import  # 延迟导入
+
+msgpack = lazy_import("msgpack")  # AirSim 使用 msgpack-rpc 协议
+
+# 假场景中各物体的位置（NED 坐标），仅用于基准测试，与真实场景无关
+FAKE_OBJECT_POSITIONS = {
+    "turbine1": [60.0, -40.0, 0.0],
+    "turbine2": [90.0, 30.0, 0.0],
+    "solarpanels": [30.0, 60.0, 0.0],
+    "crowd": [-20.0, 10.0, 0.0],
+    "car": [15.0, -15.0, 0.0],
+    "tower1": [-50.0, -60.0, 0.0],
+    "tower2": [-80.0, 0.0, 0.0],
+    "tower3": [-50.0, 60.0, 0.0],
+}
+
+# 需要等待飞行结束才返回的 RPC（对应客户端的 *Async 方法），在单独的线程中执行
+TASK_METHODS = {"takeoff", "land", "moveToPosition", "moveOnPath", "rotateToYaw"}
+
+
+def _vector(x=0.0, y=0.0, z=0.0):
+    return {"x_val": float(x), "y_val": float(y), "z_val": float(z)}
+
+
+def _quaternion(yaw):
+    # 只有偏航角的四元数（绕 z 轴旋转）
+    return {"w_val": math.cos(yaw / 2), "x_val": 0.0, "y_val": 0.0, "z_val": math.sin(yaw / 2)}
+
+
+class FakeAirSimServer:
+    """
+    本地模拟的 AirSim RPC 服务（msgpack-rpc 协议），实现 AirSimWrapper 与控制服务用到的 API，
+    用于在没有模拟器的情况下做基准测试。
+    - latency：每次 RPC 额外增加的延迟（秒），模拟真实模拟器的处理耗时；
+    - time_scale：飞行耗时 = 航程 / 速度 × time_scale，0 表示飞行任务立即完成；
+    - image_size：simGetImages 返回的图像尺寸（宽, 高），图像总是未压缩的 BGR 数据；
+    - counts：按 RPC 名称统计的调用次数。
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, time_scale=0.0, image_size=(320, 240)):
+        """
+        :param host: 监听地址
+        :param port: 监听端口，0 表示由系统分配（见 self.port）
+        :param latency: 每次 RPC 的额外延迟（秒）
+        :param time_scale: 飞行耗时的缩放倍数，0 表示立即完成
+        :param image_size: simGetImages 返回的图像尺寸（宽, 高）
+        """
+        self.latency = latency
+        self.time_scale = time_scale
+        self.image_size = image_size
+        self.counts = Counter()
+        self.counts_lock = threading.Lock()
+        self.state_lock = threading.Lock()
+        self.position = [0.0, 0.0, 0.0]
+        self.velocity = [0.0, 0.0, 0.0]
+        self.yaw = 0.0  # 弧度
+        self.landed = True
+        self.task_generation = 0  # 每个新任务或 cancelLastTask 加 1，正在飞行的任务据此停止
+        self.scene = {objects_dict[name]: position for name, position in FAKE_OBJECT_POSITIONS.items()}
+        self.handlers = {
+            "ping": lambda: True,
+            "getServerVersion": lambda: 1,
+            "getMinRequiredClientVersion": lambda: 1,
+            "enableApiControl": lambda enabled, vehicle="": None,
+            "armDisarm": lambda arm, vehicle="": True,
+            "simGetVehiclePose": self._vehicle_pose,
+            "getMultirotorState": self._multirotor_state,
+            "simListSceneObjects": self._list_scene_objects,
+            "simGetObjectPose": self._object_pose,
+            "simGetImages": self._images,
+            "cancelLastTask": self._cancel,
+            "takeoff": lambda timeout, vehicle="": self._fly([[self.position[0], self.position[1], -3.0]], 2.0),
+            "land": self._land,
+            "moveToPosition": lambda x, y, z, velocity, *rest: self._fly([[x, y, z]], velocity),
+            "moveOnPath": lambda path, velocity, *rest: self._fly(
+                [[p["x_val"], p["y_val"], p["z_val"]] for p in path], velocity),
+            "rotateToYaw": self._rotate,
+        }
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+
+    def start(self):
+        """
+        在后台线程中开始接受连接，返回自身以便链式调用。
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return  # 已关闭
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def close(self):
+        self.sock.close()
+
+    def reset_counts(self):
+        with self.counts_lock:
+            self.counts.clear()
+
+    def snapshot_counts(self):
+        with self.counts_lock:
+            return Counter(self.counts)
+
+    # -------------------------- 协议 --------------------------
+    def _serve_connection(self, conn):
+        unpacker = msgpack.Unpacker(raw=False)
+        send_lock = threading.Lock()
+
+        def reply(msgid, error, result):
+            data = msgpack.packb([1, msgid, error, result], use_bin_type=True)
+            with send_lock:
+                conn.sendall(data)
+
+        with conn:
+            while True:
+                try:
+                    data = conn.recv(65536)
+                except OSError:
+                    return
+                if not data:
+                    return
+                unpacker.feed(data)
+                for message in unpacker:
+                    if message[0] != 0:
+                        continue  # 只处理请求，忽略通知
+                    _, msgid, method, params = message
+                    if method in TASK_METHODS:
+                        # 飞行任务在单独的线程中执行，同一连接上的其他请求（如 cancelLastTask）不会被阻塞
+                        threading.Thread(target=self._dispatch, args=(reply, msgid, method, params),
+                                         daemon=True).start()
+                    else:
+                        self._dispatch(reply, msgid, method, params)
+
+    def _dispatch(self, reply, msgid, method, params):
+        with self.counts_lock:
+            self.counts[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        handler = self.handlers.get(method)
+        if handler is None:
+            reply(msgid, f"rpc method not found: {method}", None)
+            return
+        try:
+            reply(msgid, None, handler(*params))
+        except Exception as e:
+            reply(msgid, f"{type(e).__name__}: {e}", None)
+
+    # -------------------------- 模拟的 API --------------------------
+    def _vehicle_pose(self, vehicle=""):
+        with self.state_lock:
+            return {"position": _vector(*self.position), "orientation": _quaternion(self.yaw)}
+
+    def _multirotor_state(self, vehicle=""):
+        with self.state_lock:
+            kinematics = {"position": _vector(*self.position), "orientation": _quaternion(self.yaw),
+                          "linear_velocity": _vector(*self.velocity)}
+            return {"kinematics_estimated": kinematics, "landed_state": 0 if self.landed else 1,
+                    "timestamp": time.time_ns()}
+
+    def _list_scene_objects(self, name_regex=".*"):
+        return [name for name in self.scene if re.match(name_regex, name)]
+
+    def _object_pose(self, object_name, *rest):
+        return {"position": _vector(*self.scene[object_name]), "orientation": _quaternion(0.0)}
+
+    def _images(self, requests, vehicle="", external=False):
+        # 每个请求返回一张随位置变化的渐变图像，数据量与同尺寸的真实图像相同
+        width, height = self.image_size
+        with self.state_lock:
+            position, yaw = list(self.position), self.yaw
+        shade = int(abs(position[0]) + abs(position[1])) % 256
+        data = bytes((x + shade) % 256 for x in range(width)) * 3 * height
+        return [{"image_data_uint8": data, "image_data_float": [], "camera_position": _vector(*position),
+                 "camera_orientation": _quaternion(yaw), "time_stamp": time.time_ns(), "message": "",
+                 "pixels_as_float": False, "compress": False, "width": width, "height": height,
+                 "image_type": request["image_type"]} for request in requests]
+
+    def _cancel(self, vehicle=""):
+        with self.state_lock:
+            self.task_generation += 1
+
+    def _land(self, timeout=60, vehicle=""):
+        self._fly([[self.position[0], self.position[1], 0.0]], 1.0)
+        with self.state_lock:
+            self.landed = True
+
+    def _rotate(self, yaw, timeout=60, margin=5, vehicle=""):
+        with self.state_lock:
+            self.yaw = math.radians(yaw)
+
+    def _fly(self, path, velocity):
+        """
+        沿路径匀速飞行。time_scale 为 0 时直接到达终点，否则按缩放后的耗时逐步更新位置，
+        使其他连接在飞行过程中可以查询到中间位置；被取消时停在当前位置。
+        """
+        with self.state_lock:
+            self.task_generation += 1
+            generation = self.task_generation
+            self.landed = False
+        velocity = max(float(velocity), 0.1)
+        for target in path:
+            target = [float(c) for c in target]
+            start = list(self.position)
+            distance = math.dist(start, target)
+            duration = distance / velocity * self.time_scale
+            t0 = time.time()
+            while True:
+                elapsed = time.time() - t0
+                frac = 1.0 if elapsed >= duration else elapsed / duration
+                with self.state_lock:
+                    if self.task_generation != generation:
+                        self.velocity = [0.0, 0.0, 0.0]
+                        return
+                    self.position = [s + frac * (t - s) for s, t in zip(start, target)]
+                    self.velocity = [(t - s) / distance * velocity if distance and frac < 1 else 0.0
+                                     for s, t in zip(start, target)]
+                if frac >= 1.0:
+                    break
+                time.sleep(min(0.02, duration - elapsed))
+        with self.state_lock:
+            self.velocity = [0.0, 0.0, 0.0]
+
+
+if __name__ == "__main__":
+    # 单独运行时可代替 AirSim，供各前端脚本离线调试，例如：
+    #   python fake_airsim_server.py --port 41451 --time-scale 0.1
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=41451, help="监听端口（AirSim 默认 41451）")
+    parser.add_argument("--latency", type=float, default=0.0, help="每次 RPC 的额外延迟（秒）")
+    parser.add_argument("--time-scale", type=float, default=0.0, help="飞行耗时的缩放倍数，0 表示立即完成")
+    parser.add_argument("--image-size", type=int, nargs=2, default=[320, 240], help="模拟图像的宽和高")
+    args = parser.parse_args()
+
+    server = FakeAirSimServer(args.host, args.port, args.latency, args.time_scale, tuple(args.image_size))
+    print(f"模拟 AirSim 服务已启动: {args.host}:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
@@ -0,0 +1,281 @@
+#inspection_capture.py
+import atexit  # 程序退出时写完队列中的图像
+import json  # 拍摄记录采用 JSON Lines 格式
+import math  # 计算距离与偏航角
+import os  # 创建输出目录
+import queue  # 有界的图像队列（背压）
+import threading  # 位置轮询线程与编码 / 写入线程
+import time  # 时间戳与阻塞耗时统计
+
+from startup import lazy_import  # 延迟导入
+
+airsim = lazy_import("airsim")  # AirSim 库（首次使用时导入）
+np = lazy_import("numpy")  # 将原始图像数据转换为数组
+cv2 = lazy_import("cv2")  # 图像编码（opencv-contrib-python）
+
+# 可拍摄的图像类型（名称 -> AirSim ImageType 的属性名）
+IMAGE_TYPES = {
+    "scene": "Scene",
+    "depth": "DepthVis",
+    "segmentation": "Segmentation",
+}
+
+
+class InspectionCapture:
+    """
+    巡检拍摄：在 fly_path 飞行过程中，当无人机经过路径点（或每飞行一定距离）时拍摄图像并记录位姿。
+    - 拍摄使用独立的 AirSim 连接和轮询线程，主连接上的 moveOnPathAsync 照常以全速飞行；
+    - AirSim 只返回未压缩的原始图像，编码（PNG / JPG）和写文件由后台线程池完成；
+    - 轮询线程与线程池之间是有界队列：队列满时轮询线程等待（block）或丢弃本次拍摄（drop），
+      避免编码跟不上时内存无限增长；
+    - 每次拍摄标注距离最近的 objects_dict 物体（水平距离），记录在 captures.jsonl 中。
+    """
+
+    def __init__(self, output_dir="inspection", client=None, interval=None, radius=2.0, camera="0",
+                 image_types=("scene",), image_format="jpg", quality=90, workers=2, queue_size=8,
+                 on_full="block", poll_interval=0.05, points=None):
+        """
+        :param output_dir: 输出目录，图像与 captures.jsonl 保存在其中
+        :param client: 拍摄使用的客户端，默认新建 MultirotorClient（不能与飞行命令共用同一连接）
+        :param interval: 每飞行多少米拍摄一次，None 表示只在路径点拍摄
+        :param radius: 距离路径点小于该值（米）时视为经过
+        :param camera: 相机名称
+        :param image_types: 拍摄的图像类型（IMAGE_TYPES 的键）
+        :param image_format: 保存格式，"jpg" 或 "png"
+        :param quality: JPG 质量（0-100）
+        :param workers: 编码 / 写入线程数
+        :param queue_size: 等待编码的拍摄数量上限
+        :param on_full: 队列满时的策略，"block" 等待，"drop" 丢弃
+        :param poll_interval: 位置轮询间隔（秒）
+        :param points: 固定的拍摄点，默认使用每次 fly_path 的路径点
+        """
+        self.output_dir = output_dir
+        self.client = client if client is not None else airsim.MultirotorClient()
+        self.interval = interval
+        self.radius = radius
+        self.camera = str(camera)
+        self.image_types = list(image_types)
+        self.image_format = image_format
+        self.quality = quality
+        self.on_full = on_full
+        self.poll_interval = poll_interval
+        self.points = points
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.count = 0  # 拍摄序号，跨多次 fly_path 递增
+        self.stats = {"captured": 0, "written": 0, "dropped": 0, "errors": 0, "max_queue": 0, "blocked": 0.0}
+        self._stop = threading.Event()
+        self._poller = None
+        self._meta_lock = threading.Lock()
+        self._closed = False
+
+        os.makedirs(output_dir, exist_ok=True)
+        self._meta = open(os.path.join(output_dir, "captures.jsonl"), "a", encoding="utf-8")
+        self._workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for t in self._workers:
+            t.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_args(cls, args, session=None):
+        """
+        根据命令行参数创建巡检拍摄，参数由 add_capture_args 添加；未指定 --capture 时返回 None。
+        拍摄连接不经过会话录制：图像数据会使日志急剧增大，且拍摄时机取决于轮询线程的调度，无法确定地回放。
+        回放时没有模拟器可供拍摄，因此不启用拍摄。
+        :param session: 会话，回放模式下返回 None
+        """
+        if not args.capture:
+            return None
+        if session is not None and session.mode == "replay":
+            print("回放模式下不进行巡检拍摄")
+            return None
+        return cls(args.capture, None, args.capture_interval, args.capture_radius,
+                   image_types=args.capture_types, image_format=args.capture_format,
+                   workers=args.capture_workers, queue_size=args.capture_queue)
+
+    # -------------------------- 触发 --------------------------
+    def start(self, path, objects):
+        """
+        fly_path 开始前调用：启动轮询线程，飞行过程中按路径点和距离间隔触发拍摄。
+        :param path: 本次飞行的路径点（NED 坐标）
+        :param objects: {物体名称: 位置}，用于标注拍摄目标
+        """
+        self.stop()
+        self._stop.clear()
+        points = self.points if self.points is not None else path
+        self._poller = threading.Thread(target=self._poll, args=(list(points), dict(objects)), daemon=True)
+        self._poller.start()
+
+    def stop(self):
+        """
+        fly_path 结束后调用：停止轮询（结束前再检查一次，确保终点被拍摄）。
+        不等待队列中的图像写完，飞行任务可以立即继续。
+        """
+        if self._poller is not None:
+            self._stop.set()
+            self._poller.join()
+            self._poller = None
+
+    def _poll(self, points, objects):
+        pending = list(range(len(points)))  # 尚未经过的路径点序号
+        last, travelled = None, 0.0
+        next_mark = self.interval
+        while True:
+            stopping = self._stop.is_set()
+            try:
+                pose = self.client.simGetVehiclePose()
+            except Exception as e:
+                print(f"⚠ 巡检拍摄获取位姿失败: {e}")
+                with self._meta_lock:
+                    self.stats["errors"] += 1
+                if stopping:
+                    return
+                self._stop.wait(self.poll_interval)
+                continue
+            position = [pose.position.x_val, pose.position.y_val, pose.position.z_val]
+            previous = last if last is not None else position
+            travelled += math.dist(previous, position)
+            last = position
+
+            triggers = []
+            for i in list(pending):
+                # 按两次轮询之间的线段判断，速度较快、一次轮询移动超过 radius 时也不会漏过路径点
+                if segment_distance(points[i], previous, position) <= self.radius:
+                    pending.remove(i)
+                    triggers.append(f"waypoint {i}")
+            if self.interval and travelled >= next_mark:
+                triggers.append(f"interval {travelled:.1f}m")
+                next_mark = (travelled // self.interval + 1) * self.interval
+            if triggers:
+                self._capture(pose, position, ", ".join(triggers), objects)
+
+            if stopping:
+                return
+            self._stop.wait(self.poll_interval)
+
+    def _capture(self, pose, position, trigger, objects):
+        requests = [airsim.ImageRequest(self.camera, getattr(airsim.ImageType, IMAGE_TYPES[name]), False, False)
+                    for name in self.image_types]
+        try:
+            responses = self.client.simGetImages(requests)
+        except Exception as e:
+            print(f"⚠ 巡检拍摄获取图像失败: {e}")
+            with self._meta_lock:
+                self.stats["errors"] += 1
+            return
+        target, distance = nearest_object(position, objects)
+        self.count += 1
+        frame = {
+            "index": self.count,
+            "time": time.time(),
+            "trigger": trigger,
+            "position": position,
+            "yaw": math.degrees(airsim.to_eularian_angles(pose.orientation)[2]),
+            "target": target,
+            "target_distance": None if distance is None else round(distance, 2),
+            "images": [(name, r.width, r.height, r.image_data_uint8) for name, r in zip(self.image_types, responses)],
+        }
+        self.stats["captured"] += 1
+        if self.on_full == "drop":
+            try:
+                self.queue.put_nowait(frame)
+            except queue.Full:
+                self.stats["dropped"] += 1
+                return
+        else:
+            start = time.time()
+            self.queue.put(frame)  # 队列满时等待，拍摄频率随之下降
+            self.stats["blocked"] += time.time() - start
+        self.stats["max_queue"] = max(self.stats["max_queue"], self.queue.qsize())
+
+    # -------------------------- 编码与写入 --------------------------
+    def _worker(self):
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                self.queue.task_done()
+                return
+            try:
+                self._write(frame)
+            except Exception as e:
+                print(f"⚠ 巡检图像写入失败: {e}")
+                with self._meta_lock:
+                    self.stats["errors"] += 1
+            finally:
+                self.queue.task_done()
+
+    def _write(self, frame):
+        files = []
+        for name, width, height, data in frame.pop("images"):
+            # 原始数据为 BGR（旧版 AirSim 为 BGRA），通道数由数据长度推算
+            image = np.frombuffer(data, dtype=np.uint8).reshape(height, width, -1)
+            if self.image_format == "jpg":
+                ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            else:
+                ok, encoded = cv2.imencode(".png", image)
+            if not ok:
+                raise RuntimeError(f"图像编码失败: {name}")
+            filename = f"{frame['index']:05d}_{name}.{self.image_format}"
+            with open(os.path.join(self.output_dir, filename), "wb") as f:
+                f.write(encoded.tobytes())
+            files.append(filename)
+        frame["files"] = files
+        with self._meta_lock:
+            self._meta.write(json.dumps(frame, ensure_ascii=False) + "\n")
+            self._meta.flush()
+            self.stats["written"] += 1
+
+    def close(self):
+        """
+        停止拍摄，等待队列中的图像全部写完。程序退出时自动调用。
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.stop()
+        for _ in self._workers:
+            self.queue.put(None)
+        for t in self._workers:
+            t.join()
+        self._meta.close()
+        s = self.stats
+        print(f"巡检拍摄: 拍摄 {s['captured']} 次，写入 {s['written']}，丢弃 {s['dropped']}，错误 {s['errors']}，"
+              f"队列峰值 {s['max_queue']}，等待 {s['blocked']:.2f}s")
+
+
+def segment_distance(point, start, end):
+    """
+    点 point 到线段 start -> end 的距离。
+    """
+    seg = [e - s for s, e in zip(start, end)]
+    length2 = sum(c * c for c in seg)
+    if length2 == 0:
+        return math.dist(point, start)
+    t = max(0.0, min(1.0, sum((p - s) * c for p, s, c in zip(point, start, seg)) / length2))
+    return math.dist(point, [s + t * c for s, c in zip(start, seg)])
+
+
+def nearest_object(position, objects):
+    """
+    返回与 position 水平距离最近的物体名称和距离（涡轮机、电塔等按竖直方向处理，只比较水平距离）。
+    :param objects: {物体名称: 位置}
+    :return: (名称, 距离)，没有物体时返回 (None, None)
+    """
+    best, best_distance = None, None
+    for name, obj in objects.items():
+        distance = math.dist(position[:2], obj[:2])
+        if best_distance is None or distance < best_distance:
+            best, best_distance = name, distance
+    return best, best_distance
+
+
+def add_capture_args(parser):
+    """
+    为脚本添加巡检拍摄相关的命令行参数。
+    """
+    parser.add_argument("--capture", type=str, default=None, help="巡检拍摄输出目录，默认不拍摄")
+    parser.add_argument("--capture-interval", type=float, default=None, help="每飞行多少米拍摄一次，默认只在路径点拍摄")
+    parser.add_argument("--capture-radius", type=float, default=2.0, help="距离路径点小于该值（米）时拍摄")
+    parser.add_argument("--capture-types", nargs="+", default=["scene"], choices=list(IMAGE_TYPES), help="拍摄的图像类型")
+    parser.add_argument("--capture-format", type=str, default="jpg", choices=["jpg", "png"], help="图像保存格式")
+    parser.add_argument("--capture-workers", type=int, default=2, help="编码 / 写入线程数")
+    parser.add_argument("--capture-queue", type=int, default=8, help="等待编码的拍摄数量上限")
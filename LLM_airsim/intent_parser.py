@@ -0,0 +1,150 @@
+#intent_parser.py
+import re  # 正则表达式库，用于匹配简单指令
+from airsim_wrapper import objects_dict  # 场景中可用物体的名称
+
+# 物体的中文别名。涡轮机、电塔等有多个同类物体的名称必须带编号，否则交给大模型询问
+OBJECT_ALIASES = {
+    "涡轮机1": "turbine1", "风力涡轮机1": "turbine1", "风机1": "turbine1",
+    "涡轮机2": "turbine2", "风力涡轮机2": "turbine2", "风机2": "turbine2",
+    "太阳能面板": "solarpanels", "太阳能板": "solarpanels", "solar panels": "solarpanels",
+    "人群": "crowd",
+    "汽车": "car", "车": "car",
+    "电塔1": "tower1", "塔1": "tower1", "tower 1": "tower1",
+    "电塔2": "tower2", "塔2": "tower2", "tower 2": "tower2",
+    "电塔3": "tower3", "塔3": "tower3", "tower 3": "tower3",
+    "turbine 1": "turbine1", "turbine 2": "turbine2",
+}
+OBJECT_ALIASES.update({name: name for name in objects_dict})
+
+# 方向 -> (坐标轴下标, 符号)，坐标系见系统提示：X 向前、Y 向右、Z 向下
+DIRECTIONS = {
+    "前": (0, 1), "后": (0, -1), "右": (1, 1), "左": (1, -1), "下": (2, 1), "上": (2, -1),
+    "forward": (0, 1), "forwards": (0, 1), "backward": (0, -1), "backwards": (0, -1), "back": (0, -1),
+    "right": (1, 1), "left": (1, -1), "down": (2, 1), "up": (2, -1),
+}
+# "上升 10 米"、"前进 5 米" 这类动词
+DIRECTION_VERBS = {"上升": "上", "升高": "上", "下降": "下", "降低": "下", "前进": "前", "后退": "后"}
+
+_CN_DIGITS = {"零": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_NUM = r"(\d+(?:\.\d+)?|[零一二两三四五六七八九十百]+)"
+_UNIT = r"(?:个)?(?:单位|米|m|units?|meters?|metres?)?"
+
+_CLAUSE_SPLIT = re.compile(r"\s*(?:[，,。；;！!]|然后|接着|之后|再|并且|and then|then|, then| and )\s*")
+_PREFIX = re.compile(r"^(?:(?:请你?|麻烦|帮我|让|无人机|please|the drone|drone)\s*)+")
+
+_TAKEOFF = re.compile(r"^(?:起飞|take ?off)$")
+_LAND = re.compile(r"^(?:降落|着陆|落地|land)$")
+_MOVE = re.compile(r"^(?:向|往|朝)?([上下前后左右])(?:方)?(?:移动|飞行|飞|移)?" + _NUM + _UNIT + r"$")
+_MOVE_VERB = re.compile(r"^(" + "|".join(DIRECTION_VERBS) + r")" + _NUM + _UNIT + r"$")
+_MOVE_EN = re.compile(r"^(?:move|fly|go)?\s*(up|down|forwards?|backwards?|back|left|right)\s*(?:by\s*)?"
+                      + _NUM + r"\s*" + _UNIT + r"$")
+_TURN = re.compile(r"^(?:向|往)?([左右])转(?:动)?" + _NUM + r"(?:度|°)?$")
+_TURN_EN = re.compile(r"^(?:turn|rotate|yaw)\s*(left|right)\s*(?:by\s*)?" + _NUM + r"\s*(?:degrees?|deg|°)?$")
+_YAW = re.compile(r"^(?:将)?(?:偏航角?|航向角?)(?:设为|设置为|设置成|设成|转到|调整到|为|到)" + _NUM + r"(?:度|°)?$")
+_YAW_EN = re.compile(r"^(?:set\s*)?yaw\s*(?:to\s*)?" + _NUM + r"\s*(?:degrees?|deg|°)?$")
+_FLY_TO = re.compile(r"^(?:飞到|飞向|飞往|飞至|前往|去)(.+)$")
+_FLY_TO_EN = re.compile(r"^(?:fly|go|move)\s*to\s*(?:the\s*)?(.+)$")
+_WHERE = re.compile(r"^(?:获取|查询|查看)?(.+?)(?:的)?(?:位置|坐标)$")
+_WHERE_EN = re.compile(r"^(?:get\s*|where is\s*)(?:the\s*)?(?:position of\s*)?(?:the\s*)?(.+?)(?:\s*position)?$")
+_SELF_POSITION = re.compile(r"^(?:获取|查询|查看)?(?:当前|无人机|自己)(?:的)?(?:位置|坐标)$|^(?:get\s*)?(?:drone|current)\s*position$")
+
+
+def _number(text):
+    """
+    将阿拉伯数字或简单中文数字（不超过 999）转换为数值。
+    """
+    if re.match(r"^\d", text):
+        value = float(text)
+        return int(value) if value.is_integer() else value
+    total, digit = 0, 0
+    for ch in text:
+        if ch in _CN_DIGITS:
+            digit = _CN_DIGITS[ch]
+        elif ch == "十":
+            total += (digit or 1) * 10
+            digit = 0
+        elif ch == "百":
+            total += (digit or 1) * 100
+            digit = 0
+    return total + digit
+
+
+def _object(text):
+    """
+    将指令中的物体名称映射到 objects_dict 中的名称，无法确定时返回 None。
+    """
+    return OBJECT_ALIASES.get(text.strip().strip("\"'“”").lower().replace("的", ""))
+
+
+def _parse_clause(clause):
+    """
+    解析单个子句，返回对应的代码行列表；无法确定含义时返回 None。
+    """
+    if _TAKEOFF.match(clause):
+        return ["aw.takeoff()"]
+    if _LAND.match(clause):
+        return ["aw.land()"]
+
+    m = _MOVE.match(clause) or _MOVE_EN.match(clause)
+    direction = None
+    if m:
+        direction, amount = m.group(1), m.group(2)
+    else:
+        m = _MOVE_VERB.match(clause)
+        if m:
+            direction, amount = DIRECTION_VERBS[m.group(1)], m.group(2)
+    if direction is not None:
+        axis, sign = DIRECTIONS[direction]
+        target = ["pos[0]", "pos[1]", "pos[2]"]
+        target[axis] += f" {'+' if sign > 0 else '-'} {_number(amount)}"
+        return ["pos = aw.get_drone_position()", f"aw.fly_to([{', '.join(target)}])"]
+
+    m = _TURN.match(clause) or _TURN_EN.match(clause)
+    if m:
+        # 偏航角顺时针（向右）为正；get_yaw() 返回弧度，set_yaw() 使用角度
+        sign = "+" if m.group(1) in ("右", "right") else "-"
+        return [f"aw.set_yaw(math.degrees(aw.get_yaw()) {sign} {_number(m.group(2))})"]
+
+    m = _YAW.match(clause) or _YAW_EN.match(clause)
+    if m:
+        return [f"aw.set_yaw({_number(m.group(1))})"]
+
+    if _SELF_POSITION.match(clause):
+        return ["print(aw.get_drone_position())"]
+
+    m = _FLY_TO.match(clause) or _FLY_TO_EN.match(clause)
+    if m:
+        name = _object(m.group(1))
+        return None if name is None else [f'aw.fly_to(aw.get_position("{name}"))']
+
+    m = _WHERE.match(clause) or _WHERE_EN.match(clause)
+    if m:
+        name = _object(m.group(1))
+        return None if name is None else [f'print(aw.get_position("{name}"))']
+
+    return None
+
+
+def parse_intent(command):
+    """
+    在本地解析简单指令（起飞、降落、相对移动、偏航、飞往指定物体、查询位置），
+    直接生成与提示词中函数对应的代码，无需请求大模型。
+    只有当指令的每个子句都能被确定解析时才返回代码，否则返回 None 交给大模型处理。
+    :param command: 用户输入的指令（中文或英文）
+    :return: 代码字符串或 None
+    """
+    text = command.strip().lower()
+    lines = []
+    for clause in _CLAUSE_SPLIT.split(text):
+        clause = _PREFIX.sub("", clause.strip())
+        clause = re.sub(r"\s+", " ", clause).strip()
+        if not clause:
+            continue
+        # 中文子句内部的空格（如 "向上移动 10 个单位"）不影响含义
+        if re.search(r"[一-鿿]", clause):
+            clause = clause.replace(" ", "")
+        parsed = _parse_clause(clause)
+        if parsed is None:
+            return None
+        lines.extend(parsed)
+    return "\n".join(lines) if lines else None
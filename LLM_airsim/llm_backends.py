@@ -0,0 +1,215 @@
+#llm_backends.py
+import csv  # 记录竞速结果
+import json  # 解析 Ollama 的流式响应
+import os  # 检查日志文件是否存在
+import threading  # 保护竞速统计数据
+import time  # 计时
+from concurrent.futures import ThreadPoolExecutor, as_completed  # 并发请求多个后端
+
+from code_utils import extract_python_code, validate_code
+from startup import lazy_import  # 延迟导入
+
+openai = lazy_import("openai")  # OpenAI / DeepSeek API（兼容 OpenAI 接口）
+requests = lazy_import("requests")  # 调用 Ollama 与 AnythingLLM 本地 API
+
+OLLAMA_URL = "http://localhost:11434/api/chat"
+ANYTHINGLLM_URL = "http://localhost:3001/api/v1/workspace/test2/chat"
+
+
+class Cancelled(Exception):
+    """
+    竞速已决出，落后的请求被主动中断。
+    """
+
+
+# ========================== 1. 各后端的请求函数 ==========================
+# 每个函数接收完整的消息列表和 config.json 的内容，返回助手回复文本。
+# cancel 为 threading.Event，竞速决出后被设置：
+# - Ollama 以流式读取响应，每收到一个 token 检查一次，被取消时关闭连接，Ollama 检测到断开后停止生成。
+#   收到第一个 token 之前（提示词处理阶段，CPU 推理长提示词时可能持续数秒）无法检查，只能等到第一个 token；
+# - OpenAI、DeepSeek 与 AnythingLLM 的请求无法中途取消，只是不再等待结果，生成仍会在服务端完成
+#   （OpenAI / DeepSeek 仍会计费）。AnythingLLM 的 /chat 接口在生成结束后才返回整个响应体，流式读取也无法提前中断。
+# OpenAI 与 DeepSeek 通过请求参数传入密钥和地址，避免并发时互相覆盖全局设置。
+# 服务地址可以在 config 中覆盖（如 OPENAI_API_BASE、OLLAMA_URL），基准测试据此指向本地模拟服务。
+def chat_openai(messages, config, cancel=None):
+    completion = openai.ChatCompletion.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        temperature=0,
+        api_key=config["OPENAI_API_KEY"],
+        api_base=config.get("OPENAI_API_BASE", "https://api.openai.com/v1"),
+    )
+    return completion.choices[0].message.content
+
+
+def chat_deepseek(messages, config, cancel=None):
+    completion = openai.ChatCompletion.create(
+        model="deepseek-chat",
+        messages=messages,
+        temperature=0,
+        api_key=config["DEEPSEEK_API_KEY"],
+        api_base=config.get("DEEPSEEK_API_BASE", "https://api.deepseek.com"),
+    )
+    return completion.choices[0].message.content
+
+
+def chat_ollama(messages, config, cancel=None):
+    # 与 ollama_manager 的默认设置一致：模型常驻内存，options 不变以复用静态前缀的 KV 缓存
+    data = {"model": "deepseek-r1:1.5b", "messages": messages, "stream": True,
+            "keep_alive": -1, "options": {"num_ctx": 8192}}
+    parts = []
+    # 每次请求使用独立的连接，取消时关闭连接即可中断生成，不影响其他请求
+    with requests.Session() as session:
+        with session.post(config.get("OLLAMA_URL", OLLAMA_URL), json=data, stream=True) as response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                parts.append(chunk.get("message", {}).get("content", ""))
+                if chunk.get("done"):
+                    break  # 已完整返回，即使竞速已决出也按完成统计
+                if cancel is not None and cancel.is_set():
+                    raise Cancelled()
+    return "".join(parts)
+
+
+def chat_anythingllm(messages, config, cancel=None):
+    # AnythingLLM 工作区在服务端维护上下文，只发送最新一条用户消息
+    headers = {
+        "Authorization": "Bearer " + config["ANYTHINGLLM_API_KEY"],
+        "Content-Type": "application/json"
+    }
+    data = {"message": messages[-1]["content"], "mode": "query"}
+    # 该接口在生成结束后才返回，无法中途取消（cancel 不使用）
+    response = requests.post(config.get("ANYTHINGLLM_URL", ANYTHINGLLM_URL), headers=headers, json=data)
+    return response.json()["textResponse"]
+
+
+BACKENDS = {
+    "openai": chat_openai,
+    "deepseek": chat_deepseek,
+    "ollama": chat_ollama,
+    "anythingllm": chat_anythingllm,
+}
+
+
+# ========================== 2. 多后端竞速 ==========================
+class RaceResult:
+    """
+    一次竞速的结果。
+    winner 为胜出的后端名称（没有任何后端返回时为 None），
+    latencies 记录各后端的响应时间，在落后的后端返回后继续补充。
+    """
+
+    def __init__(self, backends):
+        self.backends = list(backends)
+        self.winner = None
+        self.reply = None
+        self.code = None
+        self.valid = False
+        self.latency = None  # 胜出回复的响应时间
+        self.latencies = {}
+        self.statuses = {}
+
+    def margin(self):
+        """
+        胜出者相对第二快的有效回复领先的秒数，尚未可知时返回 None。
+        """
+        others = [self.latencies[b] for b in self.backends
+                  if b != self.winner and self.statuses.get(b) == "valid"]
+        if self.winner is None or not others:
+            return None
+        return round(min(others) - self.latencies[self.winner], 2)
+
+
+def race(messages, backends, config, log_path="race_results.csv"):
+    """
+    将同一组消息并发发送给多个后端，取第一个提取出的代码通过校验的回复。
+    如果所有后端的回复都没有通过校验（例如大模型在提问），则使用最早返回的回复。
+    决出后设置取消标志：Ollama 的请求在收到下一个 token 时关闭连接中断生成（状态记为 cancelled）；
+    OpenAI、DeepSeek 与 AnythingLLM 的请求无法取消，只是不再等待，在后台结束后仅用于统计领先时间。
+    :param messages: 聊天消息列表
+    :param backends: 参与竞速的后端名称列表（BACKENDS 的键）
+    :param config: config.json 的内容
+    :param log_path: 竞速结果 CSV 文件路径，为 None 时不记录
+    :return: RaceResult
+    """
+    result = RaceResult(backends)
+    lock = threading.Lock()
+    pending = set(backends)
+    decided = [False]  # 主线程是否已选出胜者；与 pending 一起决定何时写日志
+    first_reply = None
+    cancel = threading.Event()  # 竞速决出后设置，通知落后的请求中断
+    start = time.time()
+
+    def run(name):
+        reply = BACKENDS[name](list(messages), config, cancel)
+        return name, reply, time.time() - start
+
+    def finished(name, future):
+        # 每个后端结束时（包括竞速已决出之后）记录耗时和状态
+        with lock:
+            if future.cancelled() or isinstance(future.exception(), Cancelled):
+                result.statuses[name] = "cancelled"
+            elif future.exception() is not None:
+                result.statuses[name] = "error"
+            else:
+                _, reply, latency = future.result()
+                ok, _ = validate_code(extract_python_code(reply))
+                result.latencies[name] = round(latency, 2)
+                result.statuses[name] = "valid" if ok else "invalid"
+            pending.discard(name)
+            done = not pending and decided[0]
+        if done and log_path is not None:
+            _log_race(log_path, result)
+
+    executor = ThreadPoolExecutor(max_workers=len(backends))
+    futures = {}
+    for name in backends:
+        future = executor.submit(run, name)
+        future.add_done_callback(lambda f, name=name: finished(name, f))
+        futures[future] = name
+
+    for future in as_completed(futures):
+        if future.exception() is not None:
+            print(f"⚠ 后端 {futures[future]} 请求失败: {future.exception()}")
+            continue
+        name, reply, latency = future.result()
+        code = extract_python_code(reply)
+        ok, _ = validate_code(code)
+        if first_reply is None:
+            first_reply = (name, reply, code, round(latency, 2))
+        if ok:
+            result.winner, result.reply, result.code, result.latency = name, reply, code, round(latency, 2)
+            result.valid = True
+            break
+
+    if result.winner is None and first_reply is not None:
+        result.winner, result.reply, result.code, result.latency = first_reply
+
+    cancel.set()
+    executor.shutdown(wait=False, cancel_futures=True)
+    with lock:
+        decided[0] = True
+        done = not pending
+    if done and log_path is not None:
+        _log_race(log_path, result)
+    return result
+
+
+def _log_race(log_path, result):
+    """
+    将一次竞速的结果追加到 CSV 文件。
+    """
+    file_exists = os.path.isfile(log_path)
+    with open(log_path, mode="a", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        if not file_exists:
+            writer.writerow(["时间", "参与后端", "胜出后端", "代码校验", "胜出响应时间(s)", "领先时间(s)", "各后端响应时间"])
+        winner_latency = "-" if result.latency is None else result.latency
+        margin = result.margin()
+        details = "; ".join(f"{b}={result.latencies.get(b, '-')}({result.statuses.get(b, '-')})"
+                            for b in result.backends)
+        writer.writerow([time.strftime("%Y-%m-%d %H:%M:%S"), ",".join(result.backends),
+                         result.winner or "-", "✅" if result.valid else "❌",
+                         winner_latency, "-" if margin is None else margin, details])
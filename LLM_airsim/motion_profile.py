@@ -0,0 +1,187 @@
+#motion_profile.py
+import json  # 从 JSON 文件读取任务的运动参数
+import math  # 数学库
+
+
+class MotionProfile:
+    """
+    运动参数规划：根据航段距离、加速度 / 加加速度（jerk）限制以及与场景物体的距离，
+    计算每个航段的飞行速度、超时时间和路径跟踪的前视距离，取代固定的 5 m/s 与 120 s。
+    所有坐标均为 AirSim 的 NED 坐标（z 向下为正）。
+    """
+
+    def __init__(self, max_speed=10.0, min_speed=1.0, max_accel=3.0, max_jerk=6.0,
+                 clearance=15.0, near_object_speed=3.0, timeout_margin=2.0, min_timeout=10.0,
+                 lookahead_time=2.0, min_lookahead=3.0, max_vertical_speed=None,
+                 arrival_tolerance=1.0, max_retries=1):
+        """
+        :param max_speed: 最大飞行速度（m/s）
+        :param max_vertical_speed: 最大竖直速度（m/s），爬升 / 下降较多的航段按比例降低速度；
+                                   None 表示不限制（默认），只在需要平稳升降的任务中设置
+        :param min_speed: 最小飞行速度（m/s），避免极短航段速度过低
+        :param max_accel: 最大加速度（m/s²）
+        :param max_jerk: 最大加加速度（m/s³）
+        :param clearance: 航段与场景物体的距离小于该值（m）时限速，0 表示不检查
+        :param near_object_speed: 靠近物体时的限速（m/s）
+        :param timeout_margin: 超时时间相对预计飞行时间的倍数
+        :param min_timeout: 最小超时时间（s）
+        :param lookahead_time: 路径跟踪的前视时间（s），前视距离 = 速度 × 前视时间
+        :param min_lookahead: 最小前视距离（m）
+        :param arrival_tolerance: 飞行命令返回后与航段终点的距离不超过该值（m）时视为到达
+        :param max_retries: 未到达时延长超时重试的次数，仍未到达则抛出异常
+        """
+        self.max_speed = max_speed
+        self.min_speed = min_speed
+        self.max_accel = max_accel
+        self.max_jerk = max_jerk
+        self.clearance = clearance
+        self.near_object_speed = near_object_speed
+        self.timeout_margin = timeout_margin
+        self.min_timeout = min_timeout
+        self.lookahead_time = lookahead_time
+        self.min_lookahead = min_lookahead
+        self.max_vertical_speed = max_vertical_speed
+        self.arrival_tolerance = arrival_tolerance
+        self.max_retries = max_retries
+
+    @classmethod
+    def from_json(cls, path, name="default"):
+        """
+        从 JSON 文件读取某个任务的运动参数，例如 {"default": {...}, "solar_scan": {"max_speed": 4}}。
+        未给出的参数使用默认值。
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f)[name])
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        根据命令行参数创建运动参数，参数由 add_motion_args 添加；未指定 --motion-profile 时使用默认值。
+        """
+        if not args.motion_profile:
+            return cls()
+        return cls.from_json(args.motion_profile, args.mission)
+
+    def segment_speed(self, distance):
+        """
+        航段可达到的最高速度：先加速后减速，在航段中点达到峰值。
+        受加速度限制时 v = sqrt(a·d)；受加加速度限制时 d = 2·v·sqrt(v/j)，即 v = (d·sqrt(j)/2)^(2/3)。
+        """
+        if distance <= 0:
+            return self.min_speed
+        v_accel = math.sqrt(self.max_accel * distance)
+        v_jerk = (distance * math.sqrt(self.max_jerk) / 2) ** (2 / 3)
+        return max(self.min_speed, min(self.max_speed, v_accel, v_jerk))
+
+    def vertical_limit(self, start, end, speed):
+        """
+        限制竖直方向的速度分量：沿直线飞行时竖直速度 = 速度 × |dz| / 距离。
+        """
+        distance = math.dist(start, end)
+        dz = abs(end[2] - start[2])
+        if not self.max_vertical_speed or dz == 0:
+            return speed
+        return min(speed, self.max_vertical_speed * distance / dz)
+
+    def segment_time(self, distance, speed):
+        """
+        以 speed 飞完航段的预计时间：匀速时间 + 加减速额外耗时 (v/a) + 加加速度限制的额外耗时 (a/j)。
+        """
+        return distance / speed + speed / self.max_accel + self.max_accel / self.max_jerk
+
+    def timeout(self, duration):
+        return max(self.min_timeout, duration * self.timeout_margin)
+
+    def lookahead(self, speed):
+        return max(self.min_lookahead, speed * self.lookahead_time)
+
+    def near_interval(self, start, end, obstacles):
+        """
+        航段 start -> end 上与任一物体水平距离小于 clearance 的部分，以航段参数 t ∈ [0, 1] 表示。
+        物体的位置是其底部原点，而涡轮机、电塔都很高，因此按竖直圆柱处理，只比较水平距离。
+        多个物体的区间合并为一个（取并集的首尾，偏保守）。
+        :param obstacles: 物体位置列表
+        :return: (t0, t1)，航段不靠近任何物体时返回 None
+        """
+        if not self.clearance or not obstacles:
+            return None
+        seg = [e - s for s, e in zip(start[:2], end[:2])]
+        a = sum(c * c for c in seg)
+        t0, t1 = None, None
+        for obstacle in obstacles:
+            rel = [s - o for s, o in zip(start[:2], obstacle[:2])]
+            c = sum(r * r for r in rel) - self.clearance ** 2
+            if a == 0:
+                if c < 0:
+                    return 0.0, 1.0
+                continue
+            # 求解 |start + t·seg - obstacle| = clearance
+            b = 2 * sum(r * g for r, g in zip(rel, seg))
+            disc = b * b - 4 * a * c
+            if disc <= 0:
+                continue
+            lo = max(0.0, (-b - math.sqrt(disc)) / (2 * a))
+            hi = min(1.0, (-b + math.sqrt(disc)) / (2 * a))
+            if lo < hi:
+                t0 = lo if t0 is None else min(t0, lo)
+                t1 = hi if t1 is None else max(t1, hi)
+        return None if t0 is None else (t0, t1)
+
+    def plan_segment(self, start, end, obstacles=()):
+        """
+        规划单个航段。靠近物体的部分被拆分为单独的低速航段，其余部分按距离计算速度。
+        :return: [(航段终点, 速度, 超时时间)]，start 与 end 相同时为空列表
+        """
+        interval = self.near_interval(start, end, obstacles)
+        if interval is None:
+            cuts = [(1.0, False)]
+        else:
+            t0, t1 = interval
+            cuts = [(t, near) for t, near in ((t0, False), (t1, True), (1.0, False)) if t > 0]
+        legs = []
+        previous, t_prev = start, 0.0
+        for t, near in cuts:
+            if t <= t_prev:
+                continue
+            point = [s + t * (e - s) for s, e in zip(start, end)]
+            distance = math.dist(previous, point)
+            if distance == 0:
+                continue  # 重复的点（例如路径中连续两个相同的路径点）不产生飞行命令
+            speed = self.vertical_limit(previous, point, self.segment_speed(distance))
+            if near:
+                speed = min(speed, self.near_object_speed)
+            legs.append((point, speed, self.timeout(self.segment_time(distance, speed))))
+            previous, t_prev = point, t
+        if legs:
+            legs[-1] = (list(end),) + legs[-1][1:]  # 终点使用原始坐标，避免浮点误差
+        return legs
+
+    def plan_path(self, start, points, obstacles=()):
+        """
+        规划路径：逐段计算速度，并将速度相同的连续航段合并为一次路径飞行。
+        :param start: 当前位置
+        :param points: 路径点列表
+        :return: [(路径点列表, 速度, 超时时间, 前视距离)]
+        """
+        runs = []
+        previous = start
+        for point in points:
+            for leg_end, speed, _ in self.plan_segment(previous, point, obstacles):
+                distance = math.dist(previous, leg_end)
+                # 按 0.5 m/s 向下取整，便于合并相近的航段（不超过规划速度，竖直速度限制仍然有效）
+                speed = max(0.5, math.floor(speed * 2) / 2)
+                if runs and runs[-1][1] == speed:
+                    runs[-1][0].append(leg_end)
+                    runs[-1][2] += self.segment_time(distance, speed)
+                else:
+                    runs.append([[leg_end], speed, self.segment_time(distance, speed)])
+                previous = leg_end
+        return [(pts, speed, self.timeout(duration), self.lookahead(speed)) for pts, speed, duration in runs]
+
+
+def add_motion_args(parser):
+    """
+    为脚本添加运动参数相关的命令行参数。
+    """
+    parser.add_argument("--motion-profile", type=str, default=None, help="运动参数 JSON 文件，默认使用内置参数")
+    parser.add_argument("--mission", type=str, default="default", help="使用运动参数文件中的哪个任务配置")
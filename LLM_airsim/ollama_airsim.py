@@ -1,9 +1,14 @@
 # ollama_airsim.py
 
-import requests  # 用于调用 Ollama 本地 API
+from startup import run_phases  # 并发启动
 import re  # 正则表达式库，用于从文本中提取代码块
 import argparse  # 用于解析命令行参数
 from airsim_wrapper import *  # 导入前面定义的 AirSimWrapper 类
+from session_recorder import Session, add_session_args  # 会话录制 / 回放
+from control_server import add_server_args, make_wrapper  # 可选：通过本地控制服务共享 AirSim 连接
+from intent_parser import parse_intent  # 本地解析简单指令
+from example_index import ExampleIndex, add_example_args  # 检索相似的成功示例
+from ollama_manager import OllamaManager, add_ollama_args  # 本地模型预热、常驻与耗时统计
 import os  # 用于与操作系统交互，例如清屏
 import json  # 用于处理 JSON 数据
 
@@ -11,8 +16,15 @@ import json  # 用于处理 JSON 数据
 parser = argparse.ArgumentParser()
 parser.add_argument("--prompt", type=str, default="prompts/airsim_basic.txt")
 parser.add_argument("--sysprompt", type=str, default="system_prompts/airsim_basic.txt")
+add_session_args(parser)  # --record / --replay / --replay-speed
+add_server_args(parser)  # --server
+add_example_args(parser)  # --examples / --top-k / --example-budget
+add_ollama_args(parser)  # --model / --host / --keep-alive / --num-ctx / --num-thread
 args = parser.parse_args()
 
+# 加载过往成功运行的示例索引（文件不存在时为空，不注入示例）
+example_index = ExampleIndex.from_args(args)
+
 # 读取系统提示（系统向导提示信息）
 with open(args.sysprompt, "r", encoding="utf-8") as f:
     sysprompt = f.read()
@@ -29,19 +41,26 @@ aw.fly_to([aw.get_drone_position()[0], aw.get_drone_position()[1], aw.get_drone_
 ]
 
 # 调用本地Ollama的DeepSeek模型
-def ask(prompt):
+def ask(prompt, shots=()):
     chat_history.append({"role": "user", "content": prompt})
+    # 将检索到的相似示例插入到本次提问之前（不写入聊天记录）
+    messages = chat_history[:-1] + list(shots) + chat_history[-1:]
 
-    url = "http://localhost:11434/api/chat"
-    data = {"model": "deepseek-r1:1.5b", "messages": chat_history, "stream": False}
-
-    response = requests.post(url, json=data).json()
-    reply = response["message"]["content"]
+    reply = ollama.chat(messages)
+    print(colors.BLUE + f"[Ollama] {ollama.last_stats}" + colors.ENDC)
 
     chat_history.append({"role": "assistant", "content": reply})
 
     return reply
 
+# 录制或回放 LLM 请求（未启用时保持原样）
+session = Session.from_args(args)
+ask = session.wrap_ask(ask)
+read_input = session.wrap_input(input)  # 录制或回放用户输入的指令，回放时无需重新键入
+
+# 本地模型管理器（预热在启动阶段中与 AirSim 连接并发进行）
+ollama = OllamaManager.from_args(args)
+
 # 提取响应中的 Python 代码
 def extract_python_code(content):
     code_blocks = re.findall(r"```(.*?)```", content, re.DOTALL)
@@ -60,21 +79,31 @@ class colors:
     YELLOW = "\033[33m"
     BLUE = "\033[34m"
 
-# 初始化 AirSim 客户端
-print("正在初始化 AirSim...")
-aw = AirSimWrapper()
-print("完成.")
-
-# 读取并发送启动提示信息
+# 读取启动提示信息
 with open(args.prompt, "r", encoding="utf-8") as f:
     prompt = f.read()
 
-ask(prompt)
+# 初始化 Ollama：在后台线程中完成，与 AirSim 连接同时进行
+def init_llm():
+    # 预热：加载模型并常驻内存，同时处理静态前缀（系统提示 + 示例对话）以填充 KV 缓存
+    if session.mode != "replay":
+        for stats in ollama.warm(chat_history):
+            print(f"[Ollama 预热] {stats}")
+    ask(prompt)
+
+# 并发执行 AirSim 连接与 Ollama 初始化，启动耗时取决于较慢的一方
+print("正在初始化 AirSim 和 Ollama...")
+phases = run_phases({
+    "AirSim": lambda: make_wrapper(args, session),
+    "Ollama": init_llm,
+})
+aw = phases["AirSim"]
+print("完成.")
 print("欢迎来到 AirSim 聊天机器人！我随时准备帮助你解答 AirSim 相关的问题和命令。")
 
 # 进入命令行交互模式
 while True:
-    question = input(colors.YELLOW + "AirSim> " + colors.ENDC)
+    question = read_input(colors.YELLOW + "AirSim> " + colors.ENDC)
 
     if question in ["!quit", "!exit"]:
         break
@@ -82,7 +111,18 @@ while True:
         os.system("cls")
         continue
 
-    response = ask(question)
+    # 简单指令（起飞、降落、相对移动等）在本地直接解析执行，无需请求大模型
+    code = parse_intent(question)
+    if code is not None:
+        print(f"\n```python\n{code}\n```\n")
+        chat_history.append({"role": "user", "content": question})
+        chat_history.append({"role": "assistant", "content": f"```python\n{code}\n```"})
+        print("请稍等，我正在 AirSim 中运行代码...")
+        exec(code)
+        print("完成！\n")
+        continue
+
+    response = ask(question, example_index.few_shot_messages(question))
     print(f"\n{response}\n")
 
     code = extract_python_code(response)
@@ -90,3 +130,6 @@ while True:
         print("请稍等，我正在 AirSim 中运行代码...")
         exec(code)
         print("完成！\n")
+        # 由操作员确认结果正确后才加入示例库；回放时不修改示例库
+        if args.learn and session.mode != "replay":
+            example_index.confirm_add(question, code)
@@ -0,0 +1,106 @@
+#ollama_manager.py
+from startup import lazy_import  # 延迟导入
+
+requests = lazy_import("requests")  # 用于调用 Ollama 本地 API（首次使用时导入）
+
+
+class OllamaStats:
+    """
+    从 Ollama 响应的元数据中提取的耗时统计（Ollama 返回的时间单位为纳秒）。
+    """
+
+    def __init__(self, response):
+        ns = 1e9
+        self.total = response.get("total_duration", 0) / ns  # 总耗时
+        self.load = response.get("load_duration", 0) / ns  # 模型加载耗时
+        self.prompt_tokens = response.get("prompt_eval_count", 0)  # 本次实际处理的提示词 token 数（命中缓存的前缀不计入）
+        self.prompt_eval = response.get("prompt_eval_duration", 0) / ns  # 提示词处理耗时
+        self.gen_tokens = response.get("eval_count", 0)  # 生成的 token 数
+        self.gen = response.get("eval_duration", 0) / ns  # 生成耗时
+
+    def __str__(self):
+        speed = self.gen_tokens / self.gen if self.gen else 0
+        return (f"加载 {self.load:.2f}s | 提示词 {self.prompt_tokens} tokens {self.prompt_eval:.2f}s | "
+                f"生成 {self.gen_tokens} tokens {self.gen:.2f}s ({speed:.1f} tokens/s) | 总计 {self.total:.2f}s")
+
+
+class OllamaManager:
+    """
+    管理本地 Ollama 模型：启动时预热并常驻内存，复用静态前缀的 KV 缓存，并记录各阶段耗时。
+    Ollama 会为同一模型复用与上一次请求相同的提示词前缀的 KV 缓存，
+    因此只要模型不被卸载、options 不变、系统提示和示例始终位于消息开头，静态前缀只需处理一次。
+    """
+
+    def __init__(self, model="deepseek-r1:1.5b", host="http://localhost:11434",
+                 keep_alive=-1, num_ctx=8192, num_thread=None):
+        """
+        :param model: 模型名称
+        :param host: Ollama 服务地址
+        :param keep_alive: 模型在内存中保留的时长，-1 表示常驻
+        :param num_ctx: 上下文长度；默认的 2048 容纳不下系统提示和函数目录，且修改该值会导致模型重新加载
+        :param num_thread: 推理线程数，None 表示由 Ollama 自动决定
+        """
+        self.model = model
+        self.host = host.rstrip("/")
+        self.keep_alive = keep_alive
+        self.options = {"num_ctx": num_ctx}
+        if num_thread:
+            self.options["num_thread"] = num_thread
+        self.session = requests.Session()  # 复用 HTTP 连接
+        self.last_stats = None
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        根据命令行参数创建管理器，参数由 add_ollama_args 添加。
+        """
+        return cls(args.model, args.host, args.keep_alive, args.num_ctx, args.num_thread)
+
+    def _post(self, path, data):
+        data.update(model=self.model, keep_alive=self.keep_alive, stream=False)
+        response = self.session.post(self.host + path, json=data)
+        response.raise_for_status()
+        return response.json()
+
+    def warm(self, prefix_messages=None):
+        """
+        预热：加载模型并常驻内存；给定静态前缀时，再处理一次前缀以填充 KV 缓存。
+        :param prefix_messages: 静态前缀消息（系统提示、示例对话等）
+        :return: 预热各步骤的耗时统计
+        """
+        # 不带 prompt 的请求只加载模型；options 必须与之后的请求一致，否则 num_ctx 等不同会导致模型再次加载
+        stats = [OllamaStats(self._post("/api/generate", {"options": dict(self.options)}))]
+        if prefix_messages:
+            options = dict(self.options, num_predict=1)  # 只需处理提示词，生成 1 个 token 即可
+            stats.append(OllamaStats(self._post("/api/chat", {"messages": prefix_messages, "options": options})))
+        return stats
+
+    def chat(self, messages):
+        """
+        发送聊天请求，返回回复文本，并记录本次耗时统计到 last_stats。
+        :param messages: 完整的消息列表，静态前缀应保持在开头不变
+        """
+        response = self._post("/api/chat", {"messages": messages, "options": dict(self.options)})
+        self.last_stats = OllamaStats(response)
+        return response["message"]["content"]
+
+
+def _keep_alive(text):
+    """
+    纯数字按秒数传给 Ollama（-1 表示常驻），否则按 "30m" 这类时长字符串传递。
+    """
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+def add_ollama_args(parser):
+    """
+    为前端脚本添加 Ollama 相关的命令行参数。
+    """
+    parser.add_argument("--model", type=str, default="deepseek-r1:1.5b", help="Ollama 模型名称")
+    parser.add_argument("--host", type=str, default="http://localhost:11434", help="Ollama 服务地址")
+    parser.add_argument("--keep-alive", type=_keep_alive, default=-1, help="模型常驻时长，-1 表示常驻内存，也可为 30m 等")
+    parser.add_argument("--num-ctx", type=int, default=8192, help="上下文长度")
+    parser.add_argument("--num-thread", type=int, default=None, help="推理线程数")
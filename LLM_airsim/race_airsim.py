@@ -0,0 +1,133 @@
+#race_airsim.py
+import argparse  # 用于解析命令行参数
+from startup import run_phases  # 并发启动
+from airsim_wrapper import *  # 导入前面定义的 AirSimWrapper 类
+from session_recorder import Session, add_session_args  # 会话录制 / 回放
+from control_server import add_server_args, make_wrapper  # 可选：通过本地控制服务共享 AirSim 连接
+from intent_parser import parse_intent  # 本地解析简单指令
+from example_index import ExampleIndex, add_example_args  # 检索相似的成功示例
+from llm_backends import BACKENDS, race  # 多后端竞速
+from code_utils import extract_python_code  # 提取响应中的 Python 代码
+import os  # 用于与操作系统交互，例如清屏
+import json  # 用于处理 JSON 数据
+
+# 解析命令行参数
+parser = argparse.ArgumentParser()
+parser.add_argument("--prompt", type=str, default="prompts/airsim_basic.txt")
+parser.add_argument("--sysprompt", type=str, default="system_prompts/airsim_basic.txt")
+parser.add_argument("--backends", type=str, default="openai,deepseek",
+                    help="参与竞速的后端，逗号分隔，可选: " + ", ".join(BACKENDS))
+parser.add_argument("--race-log", type=str, default="race_results.csv", help="竞速结果记录文件")
+add_session_args(parser)  # --record / --replay / --replay-speed
+add_server_args(parser)  # --server
+add_example_args(parser)  # --examples / --top-k / --example-budget
+args = parser.parse_args()
+
+# 加载过往成功运行的示例索引（文件不存在时为空，不注入示例）
+example_index = ExampleIndex.from_args(args)
+
+backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+for b in backends:
+    if b not in BACKENDS:
+        parser.error(f"未知后端 {b}，可选: {', '.join(BACKENDS)}")
+
+# 读取配置文件（包含 API 密钥）
+with open("config.json", "r") as f:
+    config = json.load(f)
+
+# 读取系统提示（系统向导提示信息）
+with open(args.sysprompt, "r", encoding="utf-8") as f:
+    sysprompt = f.read()
+
+# 设置初始的聊天记录，包括系统提示和一个简单的用户请求示例
+chat_history = [
+    {"role": "system", "content": sysprompt},
+    {"role": "user", "content": "向前是正 X 轴方向(X增大代表飞行向前，减小代表飞行向后)。向右是正 Y 轴方向(Y增大代表飞行向右，减小代表飞行向左)。向下是正 Z 轴方向(Z增大代表飞行向下，减小代表飞行向上)。例如，要向前移动10个单位，向右移动20个单位，向上移动30个单位，应该表示为(x+10,y+20,z-30)。请向上移动 10 个单位"},
+    {"role": "assistant", "content": """```python
+aw.fly_to([aw.get_drone_position()[0], aw.get_drone_position()[1], aw.get_drone_position()[2]-10])
+```
+
+这段代码使用了 `fly_to()` 函数，将无人机移动到当前位置上方的 10 个单位。它通过调用 `get_drone_position()` 获取当前无人机的位置，然后创建一个新的列表，保持相同的 X 和 Y 坐标，但将 Z 坐标减少了 10。然后，无人机会通过 `fly_to()` 函数飞到这个新位置。"""}
+]
+
+# 将同一条指令并发发送给多个后端，采用第一个代码通过校验的回复
+def ask(prompt, shots=()):
+    chat_history.append({"role": "user", "content": prompt})
+    # 将检索到的相似示例插入到本次提问之前（不写入聊天记录）
+    messages = chat_history[:-1] + list(shots) + chat_history[-1:]
+
+    result = race(messages, backends, config, log_path=args.race_log)
+    if result.winner is None:
+        chat_history.pop()  # 所有后端都失败，撤销本次提问
+        raise RuntimeError("所有后端均请求失败")
+
+    status = "代码校验通过" if result.valid else "无有效代码"
+    print(colors.BLUE + f"[竞速] {result.winner} 胜出，用时 {result.latency}s（{status}）" + colors.ENDC)
+
+    chat_history.append({"role": "assistant", "content": result.reply})
+
+    return result.reply
+
+# 录制或回放 LLM 请求（未启用时保持原样）
+session = Session.from_args(args)
+ask = session.wrap_ask(ask)
+read_input = session.wrap_input(input)  # 录制或回放用户输入的指令，回放时无需重新键入
+
+# 定义颜色类，用于终端输出彩色文本
+class colors:
+    RED = "\033[31m"
+    ENDC = "\033[m"
+    GREEN = "\033[32m"
+    YELLOW = "\033[33m"
+    BLUE = "\033[34m"
+
+# 读取启动提示信息
+with open(args.prompt, "r", encoding="utf-8") as f:
+    prompt = f.read()
+
+# 初始化 LLM：在后台线程中完成，与 AirSim 连接同时进行
+def init_llm():
+    ask(prompt)  # 各后端同时处理初始提示
+
+# 并发执行 AirSim 连接与 LLM 初始化，启动耗时取决于较慢的一方
+print("正在初始化 AirSim 和 LLM...")
+phases = run_phases({
+    "AirSim": lambda: make_wrapper(args, session),
+    "LLM": init_llm,
+})
+aw = phases["AirSim"]
+print("完成.")
+print("欢迎来到 AirSim 聊天机器人！我随时准备帮助你解答 AirSim 相关的问题和命令。")
+
+# 进入命令行交互模式
+while True:
+    question = read_input(colors.YELLOW + "AirSim> " + colors.ENDC)
+
+    if question in ["!quit", "!exit"]:
+        break
+    if question == "!clear":
+        os.system("cls")
+        continue
+
+    # 简单指令（起飞、降落、相对移动等）在本地直接解析执行，无需请求大模型
+    code = parse_intent(question)
+    if code is not None:
+        print(f"\n```python\n{code}\n```\n")
+        chat_history.append({"role": "user", "content": question})
+        chat_history.append({"role": "assistant", "content": f"```python\n{code}\n```"})
+        print("请稍等，我正在 AirSim 中运行代码...")
+        exec(code)
+        print("完成！\n")
+        continue
+
+    response = ask(question, example_index.few_shot_messages(question))
+    print(f"\n{response}\n")
+
+    code = extract_python_code(response)
+    if code:
+        print("请稍等，我正在 AirSim 中运行代码...")
+        exec(code)
+        print("完成！\n")
+        # 由操作员确认结果正确后才加入示例库；回放时不修改示例库
+        if args.learn and session.mode != "replay":
+            example_index.confirm_add(question, code)
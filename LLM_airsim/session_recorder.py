@@ -0,0 +1,302 @@
+#session_recorder.py
+import atexit  # 程序退出时关闭日志文件
+import base64  # 用于编码二进制数据（如图像）
+import gzip  # 支持压缩的会话日志
+import json  # 会话日志采用 JSON Lines 格式
+import threading  # 多线程写日志时加锁
+import time  # 记录时间戳与耗时
+
+
+# ========================== 1. 序列化工具 ==========================
+def _encode(value):
+    """
+    将 RPC 参数或返回值转换为可写入 JSON 的结构。
+    AirSim 的数据类型（Pose、Vector3r 等）都带有 to_msgpack 方法，按类名 + 字段保存。
+    :param value: 任意参数或返回值
+    :return: 可 JSON 序列化的对象
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(bytes(value)).decode("ascii")}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _encode(v) for k, v in value.items()}
+    if hasattr(value, "to_msgpack"):
+        return {"__type__": value.__class__.__name__,
+                "v": {k: _encode(v) for k, v in value.__dict__.items()}}
+    if hasattr(value, "tolist"):  # numpy 数组或标量
+        return value.tolist()
+    return value
+
+
+def _decode(value):
+    """
+    _encode 的逆过程，将日志中的数据还原为 AirSim 数据类型。
+    :param value: 日志中读取的对象
+    :return: 还原后的对象
+    """
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, dict):
+        if "__bytes__" in value:
+            return base64.b64decode(value["__bytes__"])
+        if "__type__" in value:
+            import airsim  # 仅在回放包含 AirSim 数据类型时才需要
+            obj = getattr(airsim, value["__type__"])()
+            obj.__dict__.update({k: _decode(v) for k, v in value["v"].items()})
+            return obj
+        return {k: _decode(v) for k, v in value.items()}
+    return value
+
+
+def _open(path, mode):
+    """
+    打开会话日志文件，扩展名为 .gz 时使用 gzip 压缩。
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+# ========================== 2. 会话对象 ==========================
+class Session:
+    """
+    会话录制 / 回放。
+    录制模式下，记录每次 ask() 的请求与响应、每次 AirSim RPC 调用与结果（含时间戳和耗时）；
+    回放模式下，按顺序返回录制的结果，无需网络和模拟器。
+    """
+
+    def __init__(self, path=None, mode="off", speed=1.0):
+        """
+        :param path: 会话日志路径（.jsonl 或 .jsonl.gz）
+        :param mode: "record"、"replay" 或 "off"
+        :param speed: 回放加速倍数，0 表示不等待、尽快回放
+        """
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._start = time.time()
+        self._file = None
+        self._events = {}  # 回放时按通道分组的事件队列
+
+        if mode == "record":
+            self._file = _open(path, "w")
+            atexit.register(self.close)
+            self._write({"ch": "meta", "fn": "start", "ts": self._start})
+        elif mode == "replay":
+            with _open(path, "r") as f:
+                for line in f:
+                    event = json.loads(line)
+                    self._events.setdefault(event["ch"], []).append(event)
+            for queue in self._events.values():
+                queue.reverse()  # 反转后用 pop() 按录制顺序取出
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        根据命令行参数创建会话，参数由 add_session_args 添加。
+        """
+        if args.record:
+            return cls(args.record, "record")
+        if args.replay:
+            return cls(args.replay, "replay", args.replay_speed)
+        return cls()
+
+    # -------------------------- 录制 --------------------------
+    def _write(self, event):
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()  # 每条事件立即落盘，程序异常退出时日志依然完整
+
+    def record(self, channel, fn, args, ret, start, duration):
+        """
+        写入一条事件。
+        :param channel: 事件通道，例如 "llm" 或 "rpc"
+        :param fn: 函数名
+        :param args: 调用参数
+        :param ret: 返回值
+        :param start: 调用开始的绝对时间
+        :param duration: 调用耗时（秒）
+        """
+        self._write({
+            "ch": channel,
+            "fn": fn,
+            "t": round(start - self._start, 6),
+            "dur": round(duration, 6),
+            "args": _encode(args),
+            "ret": _encode(ret),
+        })
+
+    # -------------------------- 回放 --------------------------
+    def next_event(self, channel, fn):
+        """
+        取出指定通道的下一条事件，并按录制耗时（除以加速倍数）等待。
+        :param channel: 事件通道
+        :param fn: 期望的函数名，与录制不一致时说明执行流程已偏离录制
+        :return: 还原后的返回值
+        """
+        with self._lock:
+            queue = self._events.get(channel)
+            if not queue:
+                raise RuntimeError(f"回放日志中通道 {channel} 没有更多事件（调用 {fn}）")
+            event = queue.pop()
+        if event["fn"] != fn:
+            raise RuntimeError(f"回放偏离录制：期望 {event['fn']}，实际调用 {fn}")
+        if self.speed:
+            time.sleep(event["dur"] / self.speed)
+        return _decode(event["ret"])
+
+    # -------------------------- 接入点 --------------------------
+    def wrap_ask(self, ask, channel="llm"):
+        """
+        包装前端的 ask() 函数。第一个参数（提示词）和返回值会被记录。
+        回放时直接返回录制的回复，不访问网络；聊天记录不会被追加。
+        :param ask: 原始的 ask 函数
+        :param channel: 事件通道
+        :return: 包装后的函数
+        """
+        if self.mode == "off":
+            return ask
+
+        def wrapped(prompt, *args, **kwargs):
+            if self.mode == "replay":
+                ret = self.next_event(channel, "ask")
+                # 对比脚本的 ask() 返回 (回复, 响应时间)，JSON 中保存为列表
+                return tuple(ret) if isinstance(ret, list) else ret
+            start = time.time()
+            ret = ask(prompt, *args, **kwargs)
+            self.record(channel, "ask", [prompt], ret, start, time.time() - start)
+            return ret
+
+        return wrapped
+
+    def wrap_input(self, read=input, channel="user"):
+        """
+        包装交互循环中读取用户指令的 input()。录制时记录每次输入，回放时按顺序返回录制的输入，
+        无需重新键入；录制的输入用完后返回 "!quit" 结束交互循环。
+        :param read: 原始的输入函数
+        :param channel: 事件通道
+        :return: 包装后的函数
+        """
+        if self.mode == "off":
+            return read
+
+        def wrapped(prompt=""):
+            if self.mode == "replay":
+                with self._lock:
+                    exhausted = not self._events.get(channel)
+                text = "!quit" if exhausted else self.next_event(channel, "input")
+                print(f"{prompt}{text}")  # 回显回放的输入
+                return text
+            start = time.time()
+            text = read(prompt)
+            self.record(channel, "input", [], text, start, time.time() - start)
+            return text
+
+        return wrapped
+
+    def make_client(self, channel="rpc"):
+        """
+        创建供 AirSimWrapper 使用的客户端。
+        :param channel: 事件通道，同一会话中使用多个客户端时需各自区分
+        :return: 录制代理、回放客户端，或在未启用时返回 None（由 AirSimWrapper 自行创建）
+        """
+        if self.mode == "record":
+            import airsim
+            return RecordingClient(airsim.MultirotorClient(), self, channel)
+        if self.mode == "replay":
+            return ReplayClient(self, channel)
+        return None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def add_session_args(parser):
+    """
+    为前端脚本添加录制 / 回放相关的命令行参数。
+    """
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", type=str, default=None, help="录制会话日志的路径")
+    group.add_argument("--replay", type=str, default=None, help="回放会话日志的路径")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="回放加速倍数，0 表示不等待")
+
+
+# ========================== 3. AirSim 客户端代理 ==========================
+class _RecordingFuture:
+    """
+    包装 *Async 调用返回的 future，在 join() 完成时记录结果和总耗时。
+    """
+
+    def __init__(self, future, session, channel, fn, args, start):
+        self._future = future
+        self._session = session
+        self._channel = channel
+        self._fn = fn
+        self._args = args
+        self._start = start
+
+    def join(self):
+        ret = self._future.join()
+        self._session.record(self._channel, self._fn, self._args, ret,
+                             self._start, time.time() - self._start)
+        return ret
+
+
+class RecordingClient:
+    """
+    MultirotorClient 的录制代理，所有方法调用都会被转发并记录。
+    """
+
+    def __init__(self, client, session, channel="rpc"):
+        self._client = client
+        self._session = session
+        self._channel = channel
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            start = time.time()
+            ret = attr(*args, **kwargs)
+            call_args = [list(args), kwargs] if kwargs else list(args)
+            if name.endswith("Async"):
+                return _RecordingFuture(ret, self._session, self._channel, name, call_args, start)
+            self._session.record(self._channel, name, call_args, ret, start, time.time() - start)
+            return ret
+
+        return call
+
+
+class _ReplayFuture:
+    def __init__(self, session, channel, fn):
+        self._session = session
+        self._channel = channel
+        self._fn = fn
+
+    def join(self):
+        return self._session.next_event(self._channel, self._fn)
+
+
+class ReplayClient:
+    """
+    从会话日志回放的客户端，按调用顺序返回录制的结果。
+    """
+
+    def __init__(self, session, channel="rpc"):
+        self._session = session
+        self._channel = channel
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            if name.endswith("Async"):
+                return _ReplayFuture(self._session, self._channel, name)
+            return self._session.next_event(self._channel, name)
+
+        return call
@@ -0,0 +1,75 @@
+#startup.py
+import importlib  # 延迟导入模块
+import threading  # 并发执行启动阶段
+import time  # 统计各阶段耗时
+
+
+class LazyModule:
+    """
+    延迟导入的模块代理：第一次访问属性时才真正导入，读写属性都转发给真实模块。
+    用于 openai、airsim、numpy 等导入较慢的库，使导入发生在并发的启动阶段中，而不是阻塞在脚本开头。
+    """
+
+    def __init__(self, name):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    object.__setattr__(self, "_module", importlib.import_module(self._name))
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "已导入" if self._module is not None else "未导入"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name):
+    """
+    返回模块 name 的延迟导入代理。
+    """
+    return LazyModule(name)
+
+
+def run_phases(phases):
+    """
+    并发执行多个启动阶段，全部完成后打印各阶段耗时。
+    总耗时约等于最慢的单个阶段，而不是各阶段之和。
+    :param phases: {阶段名称: 无参函数}
+    :return: {阶段名称: 函数返回值}；任一阶段出错时，在所有阶段结束后抛出第一个异常
+    """
+    results, errors, timings = {}, {}, {}
+    start = time.time()
+
+    def run(name, fn):
+        t0 = time.time()
+        try:
+            results[name] = fn()
+        except BaseException as e:
+            errors[name] = e
+        timings[name] = time.time() - t0
+
+    threads = [threading.Thread(target=run, args=(name, fn), daemon=True) for name, fn in phases.items()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    total = time.time() - start
+    breakdown = " | ".join(f"{name} {timings[name]:.2f}s" + (" (失败)" if name in errors else "")
+                           for name in phases)
+    print(f"启动耗时: {breakdown} | 总计 {total:.2f}s")
+
+    for name in phases:
+        if name in errors:
+            raise errors[name]
+    return results
@@ -0,0 +1,199 @@
+#stub_llm_server.py
+import argparse  # 用于解析命令行参数
+import json  # HTTP 请求与响应使用 JSON
+import threading  # 后台运行服务、保护统计数据
+import time  # 模拟响应延迟
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # 本地 HTTP 服务
+
+from example_index import estimate_tokens  # 估计 token 数，用于模拟生成耗时和 usage 字段
+
+# 默认回复：一段简单的代码，可以通过 validate_code 校验
+DEFAULT_REPLY = """```python
+aw.fly_to([aw.get_drone_position()[0], aw.get_drone_position()[1], aw.get_drone_position()[2]-10])
+```
+
+这段代码让无人机向上飞行 10 个单位。"""
+
+
+class StubLLMServer:
+    """
+    本地模拟的大模型 HTTP 服务，兼容 OpenAI / DeepSeek（/v1/chat/completions）、
+    Ollama（/api/chat、/api/generate）和 AnythingLLM（/api/v1/workspace/<名称>/chat）的接口，
+    用于在不消耗 API 额度的情况下做基准测试。
+    - latency：每个请求的固定延迟（秒），模拟网络往返与首 token 延迟；
+    - token_latency：每个输出 token 的延迟（秒），模拟生成耗时；
+    - responder：根据消息列表生成回复文本的函数，默认总是返回 DEFAULT_REPLY；
+    - requests：记录每个请求的接口、消息数、请求体字节数和服务端耗时，用于统计聊天记录的增长和客户端开销；
+      流式请求（Ollama stream=true）逐 token 返回，客户端中途断开时记录 cancelled。
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, token_latency=0.0, responder=None):
+        """
+        :param host: 监听地址
+        :param port: 监听端口，0 表示由系统分配（见 self.port）
+        :param latency: 每个请求的固定延迟（秒）
+        :param token_latency: 每个输出 token 的延迟（秒）
+        :param responder: 回复函数 responder(messages) -> str
+        """
+        self.latency = latency
+        self.token_latency = token_latency
+        self.responder = responder or (lambda messages: DEFAULT_REPLY)
+        self.requests = []
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # 支持 keep-alive，客户端可以复用连接
+            disable_nagle_algorithm = True  # 响应头与响应体分两次发送，避免 Nagle 算法带来约 40ms 的延迟
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                raw = self.rfile.read(length)
+                body = json.loads(raw or b"{}")
+                if self.path == "/api/chat" and body.get("stream"):
+                    self._stream(body, len(raw))
+                    return
+                try:
+                    status, data = server.handle(self.path, json.loads(raw or b"{}"), len(raw))
+                except Exception as e:
+                    status, data = 500, {"error": {"message": str(e)}}
+                payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body, size):
+                # Ollama 流式响应：每行一个 JSON（分块传输编码），客户端断开时停止生成
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def write(data):
+                    line = (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+                    self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                    self.wfile.flush()
+
+                try:
+                    server.stream_chat(body, size, write)
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass  # 不在终端打印每个请求
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.url = f"http://{host}:{self.port}"
+
+    def start(self):
+        """
+        在后台线程中启动服务，返回自身以便链式调用。
+        """
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests = []
+
+    def config(self, config=None):
+        """
+        返回指向本服务的 config.json 内容，可直接传给 llm_backends 的各后端函数。
+        :param config: 在此基础上修改的配置，默认为空
+        """
+        config = dict(config or {})
+        config.update(OPENAI_API_BASE=self.url + "/v1", DEEPSEEK_API_BASE=self.url + "/v1",
+                      OLLAMA_URL=self.url + "/api/chat", ANYTHINGLLM_URL=self.url + "/api/v1/workspace/stub/chat")
+        for key in ("OPENAI_API_KEY", "DEEPSEEK_API_KEY", "ANYTHINGLLM_API_KEY"):
+            config.setdefault(key, "stub")
+        return config
+
+    def stream_chat(self, body, size, write):
+        """
+        以流式方式回复 Ollama /api/chat 请求：每个 token（约 4 个字符）写一行。
+        客户端断开时 write 抛出连接异常，生成随之停止，记录中的 cancelled 为 True。
+        """
+        messages = body.get("messages", [])
+        start = time.time()
+        reply = self.responder(messages) if messages else ""
+        record = {"path": "/api/chat", "messages": len(messages), "bytes": size, "cancelled": True}
+        with self.lock:
+            self.requests.append(record)
+        time.sleep(self.latency)
+        for i in range(0, len(reply), 4):
+            write({"model": body.get("model", "stub"), "message": {"role": "assistant", "content": reply[i:i + 4]},
+                   "done": False})
+            time.sleep(self.token_latency)
+        duration = time.time() - start
+        record.update(cancelled=False, duration=duration)
+        write({"model": body.get("model", "stub"), "message": {"role": "assistant", "content": ""}, "done": True,
+               "total_duration": int(duration * 1e9), "eval_count": estimate_tokens(reply) if reply else 0})
+
+    def handle(self, path, body, size):
+        if path.endswith("/chat/completions"):
+            messages = body.get("messages", [])
+        elif path == "/api/chat":
+            messages = body.get("messages", [])
+        elif path == "/api/generate":
+            messages = [{"role": "user", "content": body["prompt"]}] if body.get("prompt") else []
+        elif path.startswith("/api/v1/workspace/") and path.endswith("/chat"):
+            messages = [{"role": "user", "content": body.get("message", "")}]
+        else:
+            return 404, {"error": {"message": f"未知接口 {path}"}}
+        start = time.time()
+        reply = self.responder(messages) if messages else ""
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = estimate_tokens(reply) if reply else 0
+        time.sleep(self.latency + self.token_latency * completion_tokens)
+        duration = time.time() - start
+        with self.lock:
+            self.requests.append({"path": path, "messages": len(messages), "bytes": size, "duration": duration})
+
+        if path.endswith("/chat/completions"):
+            return 200, {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(start),
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            }
+        if path.startswith("/api/v1/workspace/"):
+            return 200, {"textResponse": reply, "type": "textResponse", "close": True, "error": None}
+        # Ollama：耗时字段以纳秒为单位，供 OllamaStats 解析
+        ns = int(duration * 1e9)
+        data = {"model": body.get("model", "stub"), "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "done": True, "total_duration": ns, "load_duration": 0,
+                "prompt_eval_count": prompt_tokens, "prompt_eval_duration": int(self.latency * 1e9),
+                "eval_count": completion_tokens, "eval_duration": max(0, ns - int(self.latency * 1e9))}
+        if path == "/api/chat":
+            data["message"] = {"role": "assistant", "content": reply}
+        else:
+            data["response"] = reply
+        return 200, data
+
+
+if __name__ == "__main__":
+    # 单独运行时可代替大模型服务，例如：
+    #   python stub_llm_server.py --port 11434 --latency 0.5
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=11434, help="监听端口（Ollama 默认 11434）")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="每个输出 token 的延迟（秒）")
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.host, args.port, args.latency, args.token_latency)
+    print(f"模拟大模型服务已启动: {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
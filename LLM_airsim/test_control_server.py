@@ -0,0 +1,170 @@
+#test_control_server.py
+import importlib.util  # 检查依赖是否已安装
+import time  # 等待飞行进度
+import unittest  # 测试框架
+
+# 需要 airsim 客户端和 msgpack（模拟 AirSim 服务），未安装时跳过
+HAS_AIRSIM = all(importlib.util.find_spec(name) for name in ("airsim", "msgpack"))
+
+
+@unittest.skipUnless(HAS_AIRSIM, "需要安装 airsim 和 msgpack")
+class PreemptTest(unittest.TestCase):
+    """
+    抢占多航段飞行：cancelLastTask 只中断当前航段，紧急命令到来后不能继续飞后续航段。
+    """
+
+    def setUp(self):
+        import airsim
+        from control_server import ControlServer
+        from fake_airsim_server import FakeAirSimServer
+
+        # time_scale > 0 时飞行需要时间，可以在飞行途中发送紧急命令
+        self.fake = FakeAirSimServer(time_scale=0.2).start()
+        self.server = ControlServer(airsim.MultirotorClient(port=self.fake.port),
+                                    airsim.MultirotorClient(port=self.fake.port), telemetry_interval=0)
+        self.server.submit("takeoff").done.wait()
+
+    def tearDown(self):
+        self.fake.close()
+
+    def wait_for_x(self, x, timeout=10.0):
+        deadline = time.time() + timeout
+        while self.fake.position[0] < x:
+            self.assertLess(time.time(), deadline, "无人机没有开始飞行")
+            time.sleep(0.01)
+
+    def test_emergency_stops_remaining_legs(self):
+        from control_server import PRIORITY_EMERGENCY
+
+        target = [100.0, -15.0, -5.0]
+        # 航线经过 car（15, -15）附近，被拆分为多个航段
+        legs = self.server.aw.motion_profile.plan_segment(self.fake.position, target, self.server.aw._obstacles())
+        self.assertGreater(len(legs), 1)
+
+        command = self.server.submit("fly_to", [target])
+        self.wait_for_x(7.0)
+        emergency = self.server.submit("land", priority=PRIORITY_EMERGENCY, preempt=True)
+        self.assertTrue(emergency.done.wait(10.0))
+        self.assertTrue(command.done.is_set())
+        self.assertIn("中断", command.error)
+        self.assertIsNone(emergency.error)
+        self.assertLess(self.fake.position[0], 50.0)  # 停在第一个航段附近，没有飞向目标
+        self.assertEqual(self.fake.position[2], 0.0)  # 已降落
+
+    def test_emergency_stops_remaining_path_runs(self):
+        from control_server import PRIORITY_EMERGENCY
+
+        path = [[30.0, -15.0, -5.0], [60.0, -15.0, -5.0], [100.0, -15.0, -5.0]]
+        runs = self.server.aw.motion_profile.plan_path(self.fake.position, path, self.server.aw._obstacles())
+        self.assertGreater(len(runs), 1)
+
+        command = self.server.submit("fly_path", [path])
+        self.wait_for_x(7.0)
+        emergency = self.server.submit("land", priority=PRIORITY_EMERGENCY, preempt=True)
+        self.assertTrue(emergency.done.wait(10.0))
+        self.assertIn("中断", command.error)
+        self.assertLess(self.fake.position[0], 50.0)
+
+    def test_preempt_after_worker_took_command(self):
+        from control_server import PRIORITY_NORMAL, _Command
+
+        # 工作线程已从队列取出命令、尚未开始执行时到达的抢占同样生效（模拟 preempt() 的两个步骤）
+        with self.server.preempt_lock:
+            command = _Command(PRIORITY_NORMAL, "fly_to", [[100.0, -15.0, -5.0]])
+            command.generation = self.server.preempt_generation
+            self.server.queue.put((PRIORITY_NORMAL, next(self.server.counter), command))
+            deadline = time.time() + 5.0
+            while self.server.queue.qsize():  # 工作线程取出命令后等待 preempt_lock
+                self.assertLess(time.time(), deadline)
+                time.sleep(0.01)
+            self.server._cancel_queued()
+        self.server._cancel_running()
+        self.assertTrue(command.done.wait(10.0))
+        self.assertEqual(command.error, "被抢占命令取消")
+        self.assertLess(self.fake.position[0], 1.0)
+
+    def test_finished_command_not_reported_as_preempted(self):
+        command = self.server.submit("fly_to", [[5.0, 0.0, -5.0]])
+        self.assertTrue(command.done.wait(10.0))
+        self.server.preempt()
+        self.assertIsNone(command.error)
+
+
+@unittest.skipUnless(HAS_AIRSIM, "需要安装 airsim 和 msgpack")
+class ExecRestrictionTest(unittest.TestCase):
+    """
+    /command 的 code 在受限环境中执行：不能读写文件，不能通过属性或栈帧取得服务自身的全局变量。
+    """
+
+    def setUp(self):
+        import airsim
+        from control_server import ControlServer
+        from fake_airsim_server import FakeAirSimServer
+
+        self.fake = FakeAirSimServer().start()
+        self.server = ControlServer(airsim.MultirotorClient(port=self.fake.port),
+                                    airsim.MultirotorClient(port=self.fake.port), telemetry_interval=0)
+
+    def tearDown(self):
+        self.fake.close()
+
+    def run_code(self, code):
+        command = self.server.submit(code=code)
+        self.assertTrue(command.done.wait(10.0))
+        return command.error
+
+    def test_rejected_before_execution(self):
+        for code in ["().__class__.__base__", "g = (g.gi_frame.f_back for _ in [1])\nlist(g)",
+                     "def f():\n    yield 1\nf().gi_frame", "__import__('os')"]:
+            with self.assertRaises(ValueError, msg=code):
+                self.server.submit(code=code)
+
+    def test_no_file_or_module_access(self):
+        self.assertIn("NameError", self.run_code("np.savetxt('pwn.txt', [1, 2])"))
+        self.assertIn("NameError", self.run_code("open('pwn.txt', 'w')"))
+        self.assertIn("ImportError", self.run_code("import numpy"))
+        self.assertIn("ImportError", self.run_code("import os"))
+        self.assertIn("AttributeError", self.run_code("aw.client"))
+
+    def test_generated_code_still_runs(self):
+        code = "import math\np = aw.get_drone_position()\naw.fly_to([p[0] + math.sqrt(16), p[1], -5])"
+        self.assertIsNone(self.run_code(code))
+        self.assertEqual(self.fake.position, [4.0, 0.0, -5.0])
+
+
+@unittest.skipUnless(HAS_AIRSIM, "需要安装 airsim 和 msgpack")
+class RecordReplayTest(unittest.TestCase):
+    """
+    录制时遥测线程定时查询状态，回放时不启动遥测：遥测不能混入录制的 rpc-side 通道。
+    """
+
+    def test_replay_with_telemetry_recorded(self):
+        import os
+        import tempfile
+        import airsim
+        from control_server import ControlServer
+        from fake_airsim_server import FakeAirSimServer
+        from session_recorder import RecordingClient, Session
+
+        fake = FakeAirSimServer().start()
+        path = os.path.join(tempfile.mkdtemp(), "control.jsonl")
+        record = Session(path, "record")
+        server = ControlServer(RecordingClient(airsim.MultirotorClient(port=fake.port), record, "rpc"),
+                               RecordingClient(airsim.MultirotorClient(port=fake.port), record, "rpc-side"),
+                               telemetry_interval=0.01, telemetry_client=airsim.MultirotorClient(port=fake.port))
+        server.submit("takeoff").done.wait()
+        time.sleep(0.1)  # 录制期间遥测线程多次查询
+        recorded = server.query([["get_drone_position"]])
+        record.close()
+        fake.close()
+
+        replay = Session(path, "replay", speed=0)
+        server = ControlServer(replay.make_client(), replay.make_client("rpc-side"), telemetry_interval=0)
+        command = server.submit("takeoff")
+        command.done.wait()
+        self.assertIsNone(command.error)
+        self.assertEqual(server.query([["get_drone_position"]]), recorded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+#test_intent_parser.py
+import unittest  # 测试框架
+
+from code_utils import validate_code  # 生成的代码同样需要通过执行前校验
+from intent_parser import parse_intent  # 简单指令的本地解析
+
+
+def move(axis, delta):
+    """
+    相对移动对应的代码：axis 为坐标轴下标，delta 为带符号的距离（如 "- 10"）。
+    """
+    target = ["pos[0]", "pos[1]", "pos[2]"]
+    target[axis] += f" {delta}"
+    return f"pos = aw.get_drone_position()\naw.fly_to([{', '.join(target)}])"
+
+
+class ParseIntentTest(unittest.TestCase):
+    """
+    本地解析的指令不经过大模型直接执行，这里固定 README 中列出的映射，以及必须交给大模型的指令。
+    """
+
+    def assertParses(self, cases):
+        for command, expected in cases.items():
+            with self.subTest(command=command):
+                code = parse_intent(command)
+                self.assertEqual(code, expected)
+                self.assertTrue(validate_code(code)[0])
+
+    def test_takeoff_and_land(self):
+        self.assertParses({
+            "起飞": "aw.takeoff()",
+            "请起飞": "aw.takeoff()",
+            "take off": "aw.takeoff()",
+            "降落": "aw.land()",
+            "land": "aw.land()",
+        })
+
+    def test_relative_moves_chinese(self):
+        self.assertParses({
+            "向上移动 10 个单位": move(2, "- 10"),
+            "向下移动 3 米": move(2, "+ 3"),
+            "向前飞 5 米": move(0, "+ 5"),
+            "往后移动 2 个单位": move(0, "- 2"),
+            "向右移动 20 个单位": move(1, "+ 20"),
+            "向左移动 1.5 米": move(1, "- 1.5"),
+            "上升 15 米": move(2, "- 15"),
+            "后退 4 米": move(0, "- 4"),
+        })
+
+    def test_relative_moves_english(self):
+        self.assertParses({
+            "move left 5 meters": move(1, "- 5"),
+            "fly up by 2.5 m": move(2, "- 2.5"),
+            "go forward 10 units": move(0, "+ 10"),
+            "move down 3": move(2, "+ 3"),
+        })
+
+    def test_chinese_numerals(self):
+        self.assertParses({
+            "请向前飞五米": move(0, "+ 5"),
+            "往左移动二十个单位": move(1, "- 20"),
+            "上升十五米": move(2, "- 15"),
+            "后退一百零五米": move(0, "- 105"),
+            "向上移动两米": move(2, "- 2"),
+        })
+
+    def test_turns_and_yaw(self):
+        self.assertParses({
+            "向右转 30 度": "aw.set_yaw(math.degrees(aw.get_yaw()) + 30)",
+            "向左转九十度": "aw.set_yaw(math.degrees(aw.get_yaw()) - 90)",
+            "turn left 45 degrees": "aw.set_yaw(math.degrees(aw.get_yaw()) - 45)",
+            "偏航角设为 90 度": "aw.set_yaw(90)",
+            "set yaw to 180": "aw.set_yaw(180)",
+        })
+
+    def test_multi_clause(self):
+        self.assertParses({
+            "起飞，然后向上移动十米，再降落": "aw.takeoff()\n" + move(2, "- 10") + "\naw.land()",
+            "take off and then move forward 10 meters then land": "aw.takeoff()\n" + move(0, "+ 10") + "\naw.land()",
+            "飞到太阳能板，然后降落": 'aw.fly_to(aw.get_position("solarpanels"))\naw.land()',
+        })
+
+    def test_named_objects(self):
+        self.assertParses({
+            "飞到 turbine1": 'aw.fly_to(aw.get_position("turbine1"))',
+            "飞到电塔2": 'aw.fly_to(aw.get_position("tower2"))',
+            "fly to the tower 3": 'aw.fly_to(aw.get_position("tower3"))',
+            "tower2 的位置": 'print(aw.get_position("tower2"))',
+            "where is the car": 'print(aw.get_position("car"))',
+            "当前位置": "print(aw.get_drone_position())",
+            "get drone position": "print(aw.get_drone_position())",
+        })
+
+    def test_falls_through_to_llm(self):
+        # 否定、未指明编号的同类物体、无法本地完成的子句、缺少距离等都必须交给大模型
+        for command in ["不要起飞", "飞到涡轮机", "飞到电塔", "向上移动 10 个单位并拍照", "起飞，然后拍照",
+                        "land the drone", "向上移动", "请飞向 turbine2 并保持12米距离，高度50米。", ""]:
+            with self.subTest(command=command):
+                self.assertIsNone(parse_intent(command))
+
+
+if __name__ == "__main__":
+    unittest.main()